@@ -1,6 +1,11 @@
 # db_migration.py
 import sqlite3
 import logging
+from typing import Optional
+
+from sqlalchemy.engine import make_url
+
+from config import Config
 
 # Настраиваем логирование
 logging.basicConfig(
@@ -10,14 +15,31 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-def migrate_database():
+def migrate_database(db_path: Optional[str] = None):
     """
-    Добавляет новые колонки в таблицу reviews
+    Добавляет новые колонки в таблицу reviews и индексы для частых запросов
+
+    Args:
+        db_path: Путь к файлу SQLite (по умолчанию берется из Config.DATABASE_URL)
     """
+    conn = None
     try:
-        # Подключаемся к базе данных
-        conn = sqlite3.connect('bot.db')
+        if db_path is None:
+            db_path = make_url(Config.DATABASE_URL).database
+
+        # Подключаемся к той же базе данных, что и движок бота
+        conn = sqlite3.connect(db_path)
+
+        # WAL и ослабленный synchronous убирают fsync на каждый оператор
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute("PRAGMA cache_size=-65536")
+
+        # Управляем транзакцией вручную, чтобы вся миграция шла одной транзакцией
+        conn.isolation_level = None
         cursor = conn.cursor()
+        cursor.execute("BEGIN IMMEDIATE")
 
         # Получаем текущие колонки
         cursor.execute("PRAGMA table_info(reviews)")
@@ -30,23 +52,65 @@ def migrate_database():
             'product_name': 'TEXT',
             'product_id': 'TEXT',
             'supplier_article': 'TEXT',
-            'subject_name': 'TEXT'  # Добавляем новое поле
+            'subject_name': 'TEXT',  # Добавляем новое поле
+            'photo_count': 'INTEGER'
         }
 
         # Добавляем отсутствующие колонки
+        defaults = []
         for column_name, column_type in new_columns.items():
             if column_name not in column_names:
                 logger.info(f"Adding column {column_name} to reviews table")
                 cursor.execute(f"ALTER TABLE reviews ADD COLUMN {column_name} {column_type}")
 
-                # Инициализируем колонку значениями по умолчанию
-                default_value = "'[]'" if column_name == 'photo_urls' else "''"
-                cursor.execute(f"UPDATE reviews SET {column_name} = {default_value}")
+                # Значение по умолчанию проставим одним UPDATE для всех новых колонок
+                if column_name == 'photo_urls':
+                    default_value = "'[]'"
+                elif column_name == 'photo_count':
+                    # Количество фотографий берем из уже сохраненного списка URL
+                    default_value = (
+                        "CASE WHEN json_valid(photo_urls) THEN json_array_length(photo_urls) ELSE 0 END"
+                    )
+                else:
+                    default_value = "''"
+                defaults.append((column_name, default_value))
 
                 logger.info(f"Successfully added column {column_name}")
 
+        # Инициализируем новые колонки значениями по умолчанию за один проход по таблице
+        if defaults:
+            assignments = ", ".join(f"{name} = {value}" for name, value in defaults)
+            cursor.execute(f"UPDATE reviews SET {assignments} WHERE {defaults[0][0]} IS NULL")
+
+        # photo_urls читается JSON-колонкой ORM: старые строки с некорректным JSON или не списком
+        # сбрасываем к пустому списку (флаг photo_url остается, и фото будут заново взяты из API)
+        cursor.execute(
+            "UPDATE reviews SET photo_urls = '[]', photo_count = 0 "
+            "WHERE photo_urls IS NOT NULL AND "
+            "CASE WHEN json_valid(photo_urls) THEN json_type(photo_urls) != 'array' ELSE 1 END"
+        )
+        if cursor.rowcount > 0:
+            logger.warning(f"Reset invalid photo_urls in {cursor.rowcount} reviews")
+
+        # Индексы под проверку новых отзывов и постраничный список неотвеченных
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_reviews_user_apiid ON reviews(user_id, source_api_id)"
+        )
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_reviews_user_unanswered ON reviews(user_id, is_answered, id DESC)"
+        )
+
+        # Частичный индекс по пользователям с API-ключом для фоновой проверки отзывов
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS ix_user_wbkey ON user_settings(user_id) WHERE wb_api_key IS NOT NULL"
+        )
+
+        # Обновляем статистику, чтобы планировщик запросов использовал новые индексы
+        cursor.execute("ANALYZE reviews")
+        cursor.execute("ANALYZE user_settings")
+
         # Сохраняем изменения
-        conn.commit()
+        cursor.execute("COMMIT")
         logger.info("Database migration completed")
 
         # Закрываем соединение
@@ -55,6 +119,10 @@ def migrate_database():
 
     except Exception as e:
         logger.error(f"Database migration error: {str(e)}", exc_info=True)
+        if conn is not None:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            conn.close()
         return False
 
 
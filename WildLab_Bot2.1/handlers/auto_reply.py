@@ -25,8 +25,8 @@ async def auto_reply_handler(callback: types.CallbackQuery):
 
 @router.callback_query(F.data == "auto_reply_settings")
 async def auto_reply_settings_handler(callback: types.CallbackQuery):
-    with Session() as session:
-        user = session.get(UserSettings, callback.from_user.id)
+    async with Session() as session:
+        user = await session.get(UserSettings, callback.from_user.id)
 
     text = (
         "⚙️ **Настройки автоответов**\n\n"
@@ -42,27 +42,27 @@ async def auto_reply_settings_handler(callback: types.CallbackQuery):
 
 @router.callback_query(F.data == "toggle_notifications")
 async def toggle_notifications_handler(callback: types.CallbackQuery):
-    with Session() as session:
-        user = session.get(UserSettings, callback.from_user.id)
+    async with Session() as session:
+        user = await session.get(UserSettings, callback.from_user.id)
         if not user:
             user = UserSettings(user_id=callback.from_user.id)
             session.add(user)
 
         user.notifications_enabled = not user.notifications_enabled
-        session.commit()
+        await session.commit()
 
     await auto_reply_settings_handler(callback)
 
 @router.callback_query(F.data == "toggle_auto_reply")
 async def toggle_auto_reply_handler(callback: types.CallbackQuery):
-    with Session() as session:
-        user = session.get(UserSettings, callback.from_user.id)
+    async with Session() as session:
+        user = await session.get(UserSettings, callback.from_user.id)
         if not user:
             user = UserSettings(user_id=callback.from_user.id)
             session.add(user)
 
         user.auto_reply_enabled = not user.auto_reply_enabled
-        session.commit()
+        await session.commit()
 
     await auto_reply_settings_handler(callback)
 
@@ -9,8 +9,8 @@ router = Router()
 
 @router.callback_query(F.data == "auto_reply_five_stars")
 async def auto_reply_five_stars_handler(callback: types.CallbackQuery):
-    with Session() as session:
-        user = session.get(UserSettings, callback.from_user.id)
+    async with Session() as session:
+        user = await session.get(UserSettings, callback.from_user.id)
 
     status = "✅ Включено" if user.auto_reply_five_stars else "❌ Выключено"
 
@@ -38,13 +38,13 @@ async def auto_reply_five_stars_handler(callback: types.CallbackQuery):
 
 @router.callback_query(F.data == "toggle_five_stars")
 async def toggle_five_stars_handler(callback: types.CallbackQuery):
-    with Session() as session:
-        user = session.get(UserSettings, callback.from_user.id)
+    async with Session() as session:
+        user = await session.get(UserSettings, callback.from_user.id)
         if not user:
             user = UserSettings(user_id=callback.from_user.id)
             session.add(user)
 
         user.auto_reply_five_stars = not user.auto_reply_five_stars
-        session.commit()
+        await session.commit()
 
     await auto_reply_five_stars_handler(callback)
\ No newline at end of file
@@ -1,15 +1,22 @@
 # handlers/reviews.py
 import logging
 import asyncio
-from typing import Union, Dict, Any, List, Optional
+import time
+import weakref
+from typing import Union, Dict, Any, List, Optional, Set, Tuple
 from datetime import datetime, timedelta
-import json
+import hashlib
+import re
+from functools import lru_cache
 
 from aiogram import Router, types, F, Bot
 from aiogram.exceptions import TelegramBadRequest
 from aiogram.fsm.context import FSMContext
 from aiogram.utils.keyboard import InlineKeyboardBuilder
-from aiogram.types import InlineKeyboardButton
+from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from sqlalchemy import and_, func, insert, or_, select, update
+from sqlalchemy.orm import load_only
 
 from models import UserSettings, Review, Session
 from states import ReviewState
@@ -17,60 +24,252 @@ from keyboards import (
     back_button, back_button_auto, back_button_auto2,
     back_button_auto3
 )
-from utils.wb_api import WildberriesAPI, normalize_review_fields
+from utils.wb_api import REVIEWS_MAX_TAKE, WildberriesAPI, get_wb_api, normalize_review_fields
 from utils.prompts import build_prompt
 
 router = Router()
 logger = logging.getLogger(__name__)
 
+# Время жизни закэшированных строк отзывов (в секундах)
+_REVIEWS_CACHE_TTL = 60.0
+
+# Кэш строк отзывов из БД для переходов "список → отзыв → назад":
+# user_id -> {source_api_id: (время загрузки, Review)}
+_review_rows_cache: Dict[int, Dict[str, Tuple[float, Review]]] = {}
+
+# Максимальное число закэшированных строк отзывов одного пользователя
+_REVIEW_ROWS_CACHE_SIZE = 8192
+
+# Выполняющиеся загрузки отзывов из API: (user_id, source_api_id) -> задача
+# (параллельные запросы одного отзыва ждут одну загрузку)
+_reviews_inflight: Dict[Tuple[int, str], "asyncio.Task[Optional[Dict[str, Any]]]"] = {}
+
+# Максимальное число одновременных автоответов одного пользователя
+_AUTO_REPLY_CONCURRENCY = 10
+
+# Максимальное число пользователей, обрабатываемых параллельно в check_new_reviews
+_USERS_CONCURRENCY = 8
+
+# Размер порции пользователей, загружаемых из БД за раз
+_USERS_BATCH_SIZE = 100
+
+# Колонки настроек пользователя, нужные для проверки отзывов (загружаются одним SELECT)
+_SYNC_USER_COLUMNS = load_only(
+    UserSettings.user_id,
+    UserSettings.wb_api_key,
+    UserSettings.notifications_enabled,
+    UserSettings.auto_reply_enabled,
+    UserSettings.auto_reply_five_stars,
+    UserSettings.greeting,
+    UserSettings.farewell
+)
+
+# Минимальный интервал между синхронизациями отзывов одного пользователя из интерфейса (в секундах)
+_USER_SYNC_TTL = 60.0
+
+# Время последней синхронизации из интерфейса: user_id -> time.monotonic()
+_last_user_sync: Dict[int, float] = {}
+
+# Фоновые проверки отзывов, запущенные из интерфейса: user_id -> задача
+_user_sync_tasks: Dict[int, asyncio.Task] = {}
+
+# Фоновые генерации ответов; ссылки держим, чтобы задачи не собрал сборщик мусора
+_generation_tasks: Set[asyncio.Task] = set()
+
+# Блокировки генерации по пользователям: запросы одного чата выполняются по очереди.
+# Блокировку держат ссылками только ожидающие ее задачи - после последней запись удаляется
+_generation_locks: "weakref.WeakValueDictionary[int, asyncio.Lock]" = weakref.WeakValueDictionary()
+
+# Максимальное число фотографий в одном альбоме Telegram
+_MEDIA_GROUP_LIMIT = 10
+
+# Последние отрисовки сообщений: (chat_id, message_id) -> (отпечаток текста и клавиатуры, текст в Telegram)
+_last_render: Dict[Tuple[int, int], Tuple[int, Optional[str]]] = {}
+
+# Максимальное число запоминаемых отрисовок
+_LAST_RENDER_SIZE = 4096
+
+# Маркеры промпта, от которых зависит шаблон ответа-заглушки
+_REPLY_MARKERS_RE = re.compile("Достоинства:|Недостатки:|не указаны")
+
+# Максимальное число сгенерированных ответов в кэше
+_REPLY_CACHE_SIZE = 1024
+
+# Кэш сгенерированных ответов: хэш промпта -> ответ (вытеснение в порядке добавления)
+_reply_cache: Dict[bytes, str] = {}
+
+# Планировщик периодической проверки отзывов
+_scheduler: Optional[AsyncIOScheduler] = None
+
+# Строки звезд для оценок от 0 до 5
+_STAR_STRINGS = ("", "⭐", "⭐⭐", "⭐⭐⭐", "⭐⭐⭐⭐", "⭐⭐⭐⭐⭐")
+
+# Заглушка, которой бывают заполнены пустые достоинства/недостатки
+_NOT_SPECIFIED = "не указаны"
+
+
+def _is_filled(column):
+    """
+    SQL-условие: текстовое поле заполнено и не содержит заглушку
+    """
+    # lower() в SQLite не работает с кириллицей, поэтому сравниваем с обоими вариантами написания
+    return and_(
+        func.length(func.trim(func.coalesce(column, ""))) > 0,
+        column.notin_((_NOT_SPECIFIED, _NOT_SPECIFIED.capitalize()))
+    )
+
+
+# SQL-условие непустого отзыва: есть комментарий, достоинства, недостатки или фото
+_HAS_CONTENT = or_(
+    func.length(func.trim(func.coalesce(Review.comment, ""))) > 0,
+    _is_filled(Review.pros),
+    _is_filled(Review.cons),
+    Review.photo_url == True
+)
+
 
 # ============ Вспомогательные функции ============
 
-async def get_unanswered_reviews(user_id: int) -> List[Dict[str, Any]]:
+def _has_raw_content(review: Dict[str, Any]) -> bool:
+    """
+    Быстрая проверка исходного отзыва из API до нормализации
+
+    Отзыв без текста, достоинств, недостатков и фото заведомо пустой,
+    поэтому его можно отбросить, не нормализуя
+
+    Args:
+        review: Исходные данные отзыва из API
+
+    Returns:
+        bool: False, если отзыв точно пустой
+    """
+    return bool(review.get("text") or review.get("pros") or review.get("cons") or review.get("photoLinks"))
+
+
+def _invalidate_reviews_cache(user_id: int) -> None:
+    """
+    Сбрасывает кэш отзывов пользователя после изменения данных
+
+    Args:
+        user_id: ID пользователя
+    """
+    _review_rows_cache.pop(user_id, None)
+
+
+def _cache_review_rows(user_id: int, reviews: List[Review]) -> None:
+    """
+    Сохраняет загруженные строки отзывов в кэш
+
+    Объекты остаются читаемыми после закрытия сессии (expire_on_commit=False)
+
+    Args:
+        user_id: ID пользователя
+        reviews: Загруженные отзывы
+    """
+    rows = _review_rows_cache.setdefault(user_id, {})
+    now = time.monotonic()
+    for review in reviews:
+        # Вытесняем самую старую строку при переполнении кэша
+        if len(rows) >= _REVIEW_ROWS_CACHE_SIZE and review.source_api_id not in rows:
+            rows.pop(next(iter(rows)))
+        rows[review.source_api_id] = (now, review)
+
+
+def _cached_review_row(user_id: int, review_id: str) -> Optional[Review]:
     """
-    Получение необработанных отзывов пользователя
+    Получение строки отзыва из кэша без обращения к БД
 
     Args:
         user_id: ID пользователя
+        review_id: ID отзыва в API
 
     Returns:
-        List[Dict[str, Any]]: Список отзывов
+        Optional[Review]: Отзыв или None, если его нет в кэше или запись устарела
     """
-    with Session() as session:
-        user = session.get(UserSettings, user_id)
-        if not user or not user.wb_api_key:
-            logger.warning(f"User {user_id} has no WB API key configured")
-            return []
+    cached = _review_rows_cache.get(user_id, {}).get(review_id)
+    if cached and time.monotonic() - cached[0] < _REVIEWS_CACHE_TTL:
+        return cached[1]
+    return None
 
-        try:
-            # Инициализируем API
-            wb_api = WildberriesAPI(user.wb_api_key)
 
-            # Получаем отзывы через API
-            raw_reviews = await wb_api.get_unanswered_reviews(is_answered=False)
+async def _get_review_row(session, user_id: int, review_id: str) -> Optional[Review]:
+    """
+    Получение строки отзыва из кэша или из БД
 
-            # Нормализуем данные отзывов
-            normalized_reviews = []
-            for review in raw_reviews:
-                normalized = await normalize_review_fields(review)
+    Args:
+        session: Сессия БД для запроса при промахе кэша
+        user_id: ID пользователя
+        review_id: ID отзыва в API
 
-                # Проверяем, содержит ли отзыв какую-либо информацию
-                has_content = any([
-                    normalized["comment"].strip(),
-                    normalized["pros"].strip() and normalized["pros"].lower() != "не указаны",
-                    normalized["cons"].strip() and normalized["cons"].lower() != "не указаны",
-                    normalized["photo_url"]
-                ])
+    Returns:
+        Optional[Review]: Отзыв или None, если он не найден
+    """
+    review = _cached_review_row(user_id, review_id)
+    if review is not None:
+        return review
 
-                if has_content:
-                    normalized_reviews.append(normalized)
+    review = await session.scalar(select(Review).filter_by(
+        source_api_id=review_id,
+        user_id=user_id
+    ))
+    if review:
+        _cache_review_rows(user_id, [review])
+    return review
 
-            logger.info(f"Fetched {len(normalized_reviews)} valid reviews for user {user_id}")
-            return normalized_reviews
 
-        except Exception as e:
-            logger.error(f"WB API error: {e}", exc_info=True)
-            return []
+async def get_review(user_id: int, review_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Получение необработанного отзыва пользователя по ID из API
+
+    Одновременные запросы одного отзыва (например, повторные нажатия кнопки)
+    используют одну загрузку
+
+    Args:
+        user_id: ID пользователя
+        review_id: ID отзыва в API
+
+    Returns:
+        Optional[Dict[str, Any]]: Нормализованные данные отзыва или None, если отзыв не найден
+    """
+    key = (user_id, review_id)
+    task = _reviews_inflight.get(key)
+    if task is None:
+        task = asyncio.create_task(_fetch_review(user_id, review_id))
+        _reviews_inflight[key] = task
+        task.add_done_callback(lambda _: _reviews_inflight.pop(key, None))
+
+    review = await asyncio.shield(task)
+    return dict(review) if review else None
+
+
+async def _fetch_review(user_id: int, review_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Загружает отзыв пользователя из API и нормализует его
+
+    Args:
+        user_id: ID пользователя
+        review_id: ID отзыва в API
+
+    Returns:
+        Optional[Dict[str, Any]]: Нормализованные данные отзыва или None, если отзыв не найден
+    """
+    try:
+        # Ищем один отзыв постранично, не загружая весь список.
+        # Отзыв не отвечен, поэтому список отвеченных не запрашиваем
+        async with Session() as session:
+            user = await session.get(UserSettings, user_id)
+            wb_api_key = user.wb_api_key if user else None
+
+        if not wb_api_key:
+            return None
+
+        wb_api = await get_wb_api(user_id, wb_api_key)
+        review = await wb_api.get_review_by_id(review_id, is_answered_hint=False)
+        return normalize_review_fields(review) if review else None
+
+    except Exception as e:
+        logger.error(f"Error getting review {review_id}: {e}", exc_info=True)
+        return None
 
 
 def generate_reply(prompt: str) -> str:
@@ -84,15 +283,53 @@ def generate_reply(prompt: str) -> str:
     Returns:
         str: Сгенерированный ответ
     """
-    # Базовый ответ в зависимости от наличия слов в промпте
-    if "Достоинства:" in prompt and "не указаны" not in prompt:
+    # Базовый ответ в зависимости от наличия слов в промпте (все маркеры ищем за один проход)
+    markers = set(_REPLY_MARKERS_RE.findall(prompt))
+    if "не указаны" in markers:
+        markers.clear()
+
+    if "Достоинства:" in markers:
         return "Большое спасибо за ваш отзыв и высокую оценку нашего товара! Мы очень рады, что вы отметили его достоинства. Будем и дальше стараться радовать вас качеством нашей продукции!"
-    elif "Недостатки:" in prompt and "не указаны" not in prompt:
+    elif "Недостатки:" in markers:
         return "Благодарим за ваш отзыв. Нам очень жаль, что возникли проблемы с товаром. Мы обязательно учтем ваши замечания для улучшения качества. Если вам потребуется дополнительная помощь, пожалуйста, свяжитесь с нами через чат поддержки."
     else:
         return "Спасибо за ваш отзыв! Мы ценим ваше мнение и стараемся постоянно улучшать качество наших товаров и сервиса. Будем рады видеть вас снова!"
 
 
+async def generate_reply_batch(prompts: List[str], use_cache: bool = True) -> List[str]:
+    """
+    Генерация ответов сразу для нескольких промптов
+
+    Уже сгенерированные ответы берутся из кэша по хэшу промпта,
+    а все промахи передаются генератору одним пакетом
+
+    Args:
+        prompts: Список промптов
+        use_cache: Использовать ли ранее сгенерированные ответы
+
+    Returns:
+        List[str]: Ответы в порядке промптов
+    """
+    keys = [hashlib.blake2b(prompt.encode()).digest() for prompt in prompts]
+    replies: List[Optional[str]] = [_reply_cache.get(key) if use_cache else None for key in keys]
+
+    # Собираем промпты, для которых ответа в кэше нет
+    misses = [i for i, reply in enumerate(replies) if reply is None]
+    if misses:
+        generated = await asyncio.to_thread(
+            lambda: [generate_reply(prompts[i]) for i in misses]
+        )
+        for i, reply in zip(misses, generated):
+            replies[i] = reply
+
+            # Вытесняем самый старый ответ при переполнении кэша
+            if len(_reply_cache) >= _REPLY_CACHE_SIZE:
+                _reply_cache.pop(next(iter(_reply_cache)))
+            _reply_cache[keys[i]] = reply
+
+    return replies
+
+
 async def send_review_reply(feedback_id: str, text: str, user_id: int) -> bool:
     """
     Отправляет ответ на отзыв через API Wildberries
@@ -107,38 +344,44 @@ async def send_review_reply(feedback_id: str, text: str, user_id: int) -> bool:
     """
     try:
         # Получаем API-ключ пользователя
-        with Session() as session:
-            user = session.get(UserSettings, user_id)
-            if not user or not user.wb_api_key:
-                logger.error(f"User {user_id} has no API key")
-                return False
+        async with Session() as session:
+            user = await session.get(UserSettings, user_id)
+            wb_api_key = user.wb_api_key if user else None
 
-            # Инициализируем API
-            wb_api = WildberriesAPI(user.wb_api_key)
+        if not wb_api_key:
+            logger.error(f"User {user_id} has no API key")
+            return False
 
-            # Отправляем ответ
-            result = await wb_api.send_reply(
-                feedback_id=feedback_id,
-                text=text
-            )
+        # Получаем клиент API
+        wb_api = await get_wb_api(user_id, wb_api_key)
 
-            if result:
-                # Обновляем статус отзыва в базе данных
-                review = session.query(Review).filter_by(
-                    source_api_id=feedback_id,
-                    user_id=user_id
-                ).first()
+        # Отправляем ответ
+        result = await wb_api.send_reply(
+            feedback_id=feedback_id,
+            text=text
+        )
 
-                if review:
-                    review.is_answered = True
-                    review.response = text
-                    session.commit()
-                    logger.info(f"Updated review {feedback_id} status for user {user_id}")
+        if not result:
+            logger.error(f"Failed to send reply for review {feedback_id}")
+            return False
 
-                return True
-            else:
-                logger.error(f"Failed to send reply for review {feedback_id}")
-                return False
+        _invalidate_reviews_cache(user_id)
+
+        # Обновляем статус отзыва в базе данных одним UPDATE, не загружая строку
+        async with Session() as session:
+            result = await session.execute(
+                update(Review)
+                .where(Review.source_api_id == feedback_id, Review.user_id == user_id)
+                .values(is_answered=True, response=text)
+                .execution_options(synchronize_session=False)
+            )
+            updated = result.rowcount
+            await session.commit()
+
+        if updated:
+            logger.info(f"Updated review {feedback_id} status for user {user_id}")
+
+        return True
 
     except Exception as e:
         logger.error(f"Error sending reply: {e}", exc_info=True)
@@ -147,209 +390,469 @@ async def send_review_reply(feedback_id: str, text: str, user_id: int) -> bool:
 
 # ============ Основной обработчик проверки отзывов ============
 
+async def _process_user(user: UserSettings, bot: Bot) -> None:
+    """
+    Проверяет новые отзывы одного пользователя: сохраняет их, уведомляет и отправляет автоответы
+
+    Args:
+        user: Настройки пользователя
+        bot: Экземпляр бота для отправки уведомлений
+    """
+    try:
+        # Получаем клиент API
+        wb_api = await get_wb_api(user.user_id, user.wb_api_key)
+
+        # Получаем неотвеченные отзывы
+        raw_reviews = await wb_api.get_unanswered_reviews(is_answered=False, take=REVIEWS_MAX_TAKE)
+        if not raw_reviews:
+            logger.debug(f"No new reviews for user {user.user_id}")
+            return
+
+        async with Session() as session:
+            # Одним запросом получаем ID отзывов, которые уже есть в БД
+            source_ids = [str(review.get("id", "")) for review in raw_reviews]
+            existing_ids = set(await session.scalars(
+                select(Review.source_api_id).where(
+                    Review.user_id == user.user_id,
+                    Review.source_api_id.in_(source_ids)
+                )
+            ))
+
+            # Нормализуем только новые отзывы и готовим строки для пакетной вставки
+            new_rows = []
+            for source_api_id, review in zip(source_ids, raw_reviews):
+                if source_api_id in existing_ids:
+                    continue
+
+                # Защищаемся от повторов внутри одного ответа API
+                existing_ids.add(source_api_id)
+
+                # Пустые отзывы отбрасываем до нормализации
+                if not _has_raw_content(review):
+                    continue
+
+                try:
+                    # Нормализуем данные отзыва
+                    normalized = normalize_review_fields(review)
+
+                    # Проверяем, содержит ли отзыв какую-либо информацию
+                    has_content = any([
+                        normalized.get("comment", "").strip(),
+                        normalized.get("pros", "").strip() and normalized.get("pros",
+                                                                              "").lower() != "не указаны",
+                        normalized.get("cons", "").strip() and normalized.get("cons",
+                                                                              "").lower() != "не указаны",
+                        normalized.get("photo_url", False)
+                    ])
+
+                    if not has_content:
+                        continue
+
+                    # Безопасно выбираем только нужные поля для модели Review
+                    new_rows.append({
+                        "source_api_id": source_api_id,
+                        "user_id": user.user_id,
+                        "stars": normalized.get("stars", 0),
+                        "comment": normalized.get("comment", ""),
+                        "pros": normalized.get("pros", ""),
+                        "cons": normalized.get("cons", ""),
+                        "photo_url": normalized.get("photo_url", False),
+                        "photo_urls": normalized.get("photo_urls", []),  # Список URL
+                        "photo_count": len(normalized.get("photo_urls") or []),
+                        "response": normalized.get("response", ""),
+                        "is_answered": normalized.get("is_answered", False),
+                        "product_name": normalized.get("product_name", ""),
+                        "product_id": normalized.get("product_id", ""),
+                        "supplier_article": normalized.get("supplier_article", ""),
+                        "subject_name": normalized.get("subject_name", "")  # Добавлено поле типа товара
+                    })
+
+                except Exception as review_error:
+                    logger.error(f"Error processing review: {review_error}", exc_info=True)
+
+            new_reviews_count = len(new_rows)
+
+            # Сохраняем изменения в БД одной пакетной вставкой
+            if new_reviews_count > 0:
+                await session.execute(insert(Review), new_rows)
+                await session.commit()
+
+        # Сессия закрыта: уведомления и автоответы не удерживают соединение с БД
+        if new_reviews_count > 0:
+            _invalidate_reviews_cache(user.user_id)
+            logger.info(f"Saved {new_reviews_count} new reviews for user {user.user_id}")
+
+            # Отправляем уведомление пользователю
+            if user.notifications_enabled:
+                try:
+                    # Формируем текст уведомления в зависимости от количества отзывов
+                    if new_reviews_count == 1:
+                        text = "📩 У вас 1 новый отзыв!"
+                    else:
+                        text = f"📩 У вас {new_reviews_count} новых отзывов!"
+
+                    # Отправляем уведомление
+                    await bot.send_message(
+                        user.user_id,
+                        text,
+                        reply_markup=_NEW_REVIEWS_MARKUP
+                    )
+
+                    logger.info(f"Notification sent to user {user.user_id}")
+
+                except Exception as notify_error:
+                    logger.error(f"Failed to send notification: {notify_error}", exc_info=True)
+
+        # Проверяем необходимость автоответов
+        if user.auto_reply_enabled:
+            auto_replied_count = await process_auto_replies(user, wb_api)
+            if auto_replied_count > 0:
+                _invalidate_reviews_cache(user.user_id)
+                logger.info(f"Auto-replied to {auto_replied_count} reviews for user {user.user_id}")
+
+    except Exception as user_error:
+        logger.error(f"Error processing user {user.user_id}: {user_error}", exc_info=True)
+
+
+async def check_new_reviews_for_user(user_id: int, bot: Bot) -> None:
+    """
+    Проверяет новые отзывы одного пользователя не чаще раза в _USER_SYNC_TTL секунд
+
+    Args:
+        user_id: ID пользователя в Telegram
+        bot: Экземпляр бота для отправки уведомлений
+    """
+    now = time.monotonic()
+    last_sync = _last_user_sync.get(user_id)
+    if last_sync is not None and now - last_sync < _USER_SYNC_TTL:
+        return
+
+    async with Session() as session:
+        user = await session.get(UserSettings, user_id, options=[_SYNC_USER_COLUMNS])
+
+    if not user or not user.wb_api_key:
+        return
+
+    _last_user_sync[user_id] = now
+    await _process_user(user, bot)
+
+
+def _schedule_user_sync(user_id: int, bot: Bot) -> None:
+    """
+    Запускает проверку новых отзывов пользователя в фоне, не дожидаясь ее завершения
+
+    Если проверка для пользователя уже выполняется, повторно она не запускается
+
+    Args:
+        user_id: ID пользователя в Telegram
+        bot: Экземпляр бота для отправки уведомлений
+    """
+    if user_id in _user_sync_tasks:
+        return
+
+    task = asyncio.create_task(check_new_reviews_for_user(user_id, bot))
+    _user_sync_tasks[user_id] = task
+    task.add_done_callback(lambda _: _user_sync_tasks.pop(user_id, None))
+
+
 async def check_new_reviews(bot: Bot) -> None:
     """
     Фоновая задача для проверки новых отзывов
 
+    Пользователи обрабатываются параллельно, не более _USERS_CONCURRENCY одновременно
+
     Args:
         bot: Экземпляр бота для отправки уведомлений
     """
     logger.info("Starting scheduled reviews check")
 
-    with Session() as session:
-        try:
-            # Получаем всех пользователей
-            users = session.query(UserSettings).all()
+    try:
+        semaphore = asyncio.Semaphore(_USERS_CONCURRENCY)
+
+        async def process_one(user: UserSettings) -> None:
+            async with semaphore:
+                await _process_user(user, bot)
+
+        # Загружаем пользователей с API-ключом порциями по _USERS_BATCH_SIZE (постранично по user_id).
+        # Сессия открыта только на время запроса и не удерживается во время обращений к API
+        last_user_id = None
+        while True:
+            query = select(UserSettings).options(_SYNC_USER_COLUMNS).where(
+                UserSettings.wb_api_key.isnot(None),
+                UserSettings.wb_api_key != ""
+            )
+            if last_user_id is not None:
+                query = query.where(UserSettings.user_id > last_user_id)
 
-            for user in users:
-                if not user.wb_api_key:
-                    continue
+            async with Session() as session:
+                users = (await session.scalars(
+                    query.order_by(UserSettings.user_id).limit(_USERS_BATCH_SIZE)
+                )).all()
 
-                try:
-                    # Инициализируем API
-                    wb_api = WildberriesAPI(user.wb_api_key)
+            if not users:
+                break
 
-                    # Получаем неотвеченные отзывы
-                    raw_reviews = await wb_api.get_unanswered_reviews(is_answered=False)
-                    if not raw_reviews:
-                        logger.debug(f"No new reviews for user {user.user_id}")
-                        continue
+            await asyncio.gather(
+                *(process_one(user) for user in users),
+                return_exceptions=True
+            )
+
+            if len(users) < _USERS_BATCH_SIZE:
+                break
+            last_user_id = users[-1].user_id
 
-                    # Нормализуем и обрабатываем отзывы
-                    new_reviews_count = 0
-                    for review in raw_reviews:
-                        try:
-                            # Нормализуем данные отзыва
-                            normalized = await normalize_review_fields(review)
-
-                            # Проверяем наличие отзыва в БД
-                            exists = session.query(Review).filter_by(
-                                source_api_id=normalized["source_api_id"],
-                                user_id=user.user_id
-                            ).first()
-
-                            if not exists:
-                                # Проверяем, содержит ли отзыв какую-либо информацию
-                                has_content = any([
-                                    normalized.get("comment", "").strip(),
-                                    normalized.get("pros", "").strip() and normalized.get("pros",
-                                                                                          "").lower() != "не указаны",
-                                    normalized.get("cons", "").strip() and normalized.get("cons",
-                                                                                          "").lower() != "не указаны",
-                                    normalized.get("photo_url", False)
-                                ])
-
-                                if has_content:
-                                    # Добавляем ID пользователя
-                                    normalized["user_id"] = user.user_id
-                                    photo_urls_json = json.dumps(normalized.get("photo_urls", [])) if normalized.get(
-                                        "photo_urls") else "[]"
-
-                                    # Создаем новую запись в БД
-                                    # Безопасно выбираем только нужные поля для модели Review
-                                    new_review = Review(
-                                        source_api_id=normalized["source_api_id"],
-                                        user_id=user.user_id,
-                                        stars=normalized.get("stars", 0),
-                                        comment=normalized.get("comment", ""),
-                                        pros=normalized.get("pros", ""),
-                                        cons=normalized.get("cons", ""),
-                                        photo_url=normalized.get("photo_url", False),
-                                        photo_urls=normalized.get("photo_urls", "[]"),  # JSON-строка с URL
-                                        response=normalized.get("response", ""),
-                                        is_answered=normalized.get("is_answered", False),
-                                        product_name=normalized.get("product_name", ""),
-                                        product_id=normalized.get("product_id", ""),
-                                        supplier_article=normalized.get("supplier_article", ""),
-                                        subject_name=normalized.get("subject_name", "")  # Добавлено поле типа товара
-                                    )
-                                    session.add(new_review)
-                                    new_reviews_count += 1
-
-                        except Exception as review_error:
-                            logger.error(f"Error processing review: {review_error}", exc_info=True)
-
-                    # Сохраняем изменения в БД
-                    if new_reviews_count > 0:
-                        session.commit()
-                        logger.info(f"Saved {new_reviews_count} new reviews for user {user.user_id}")
-
-                        # Отправляем уведомление пользователю
-                        if user.notifications_enabled:
-                            try:
-                                # Формируем текст уведомления в зависимости от количества отзывов
-                                if new_reviews_count == 1:
-                                    text = "📩 У вас 1 новый отзыв!"
-                                else:
-                                    text = f"📩 У вас {new_reviews_count} новых отзывов!"
-
-                                # Создаем клавиатуру для просмотра отзывов
-                                builder = InlineKeyboardBuilder()
-                                builder.button(
-                                    text="📋 Посмотреть отзывы",
-                                    callback_data="pending_reviews"
-                                )
-
-                                # Отправляем уведомление
-                                await bot.send_message(
-                                    user.user_id,
-                                    text,
-                                    reply_markup=builder.as_markup()
-                                )
-
-                                logger.info(f"Notification sent to user {user.user_id}")
-
-                            except Exception as notify_error:
-                                logger.error(f"Failed to send notification: {notify_error}", exc_info=True)
-
-                    # Проверяем необходимость автоответов
-                    if user.auto_reply_enabled:
-                        auto_replied_count = await process_auto_replies(user, wb_api, session)
-                        if auto_replied_count > 0:
-                            logger.info(f"Auto-replied to {auto_replied_count} reviews for user {user.user_id}")
-
-                except Exception as user_error:
-                    logger.error(f"Error processing user {user.user_id}: {user_error}", exc_info=True)
-
-        except Exception as global_error:
-            logger.error(f"Global check error: {global_error}", exc_info=True)
-
-async def process_auto_replies(user: UserSettings, wb_api: WildberriesAPI, session: Session) -> int:
+    except Exception as global_error:
+        logger.error(f"Global check error: {global_error}", exc_info=True)
+
+async def process_auto_replies(user: UserSettings, wb_api: WildberriesAPI) -> int:
     """
     Обрабатывает автоответы на отзывы
 
+    Сессии БД открываются только на чтение кандидатов и на запись результата,
+    отправка ответов через API идет без открытой сессии
+
     Args:
         user: Настройки пользователя
         wb_api: Экземпляр API Wildberries
-        session: Сессия БД
 
     Returns:
         int: Количество отправленных автоответов
     """
-    auto_replied_count = 0
-
     try:
-        # Получаем неотвеченные отзывы из БД
-        reviews = session.query(Review).filter_by(
-            user_id=user.user_id,
-            is_answered=False
-        ).all()
-
-        for review in reviews:
-            try:
-                # Проверяем условия для автоответа на отзывы с 5 звездами
-                if (user.auto_reply_five_stars and
-                        review.stars == 5 and
-                        (not review.cons or review.cons.strip() == "" or review.cons.lower() == "не указаны")):
-
-                    # Формируем текст автоответа
-                    auto_reply = "Спасибо за вашу высокую оценку! Мы очень рады, что вам понравился наш товар. Будем и дальше стараться радовать вас качеством нашей продукции."
-
-                    # Добавляем подписи пользователя, если они есть
-                    if user.greeting:
-                        auto_reply = f"{user.greeting} {auto_reply}"
-                    if user.farewell:
-                        auto_reply = f"{auto_reply} {user.farewell}"
-
-                    # Отправляем ответ через API
-                    success = await wb_api.send_reply(
-                        feedback_id=review.source_api_id,
-                        text=auto_reply
-                    )
-
-                    if success:
-                        # Обновляем статус отзыва в БД
-                        review.is_answered = True
-                        review.response = auto_reply
-                        auto_replied_count += 1
-                        logger.info(f"Auto-replied to review {review.source_api_id}")
-                    else:
-                        logger.error(f"Failed to auto-reply to review {review.source_api_id}")
+        # Формируем текст автоответа
+        auto_reply = "Спасибо за вашу высокую оценку! Мы очень рады, что вам понравился наш товар. Будем и дальше стараться радовать вас качеством нашей продукции."
+
+        # Добавляем подписи пользователя, если они есть
+        if user.greeting:
+            auto_reply = f"{user.greeting} {auto_reply}"
+        if user.farewell:
+            auto_reply = f"{auto_reply} {user.farewell}"
+
+        # Автоответ отправляется только на отзывы с 5 звездами
+        if not user.auto_reply_five_stars:
+            return 0
+
+        # Получаем из БД только нужные колонки неотвеченных отзывов с 5 звездами,
+        # без построения ORM-объектов
+        async with Session() as session:
+            reviews = (await session.execute(
+                select(Review.id, Review.source_api_id, Review.cons).filter_by(
+                    user_id=user.user_id,
+                    is_answered=False,
+                    stars=5
+                )
+            )).all()
+
+        # Отбираем отзывы без указанных недостатков
+        candidates = [
+            review for review in reviews
+            if not review.cons or review.cons.strip() == "" or review.cons.lower() == "не указаны"
+        ]
+
+        # Отправляем ответы через API параллельно, ограничивая число одновременных запросов
+        semaphore = asyncio.Semaphore(_AUTO_REPLY_CONCURRENCY)
+
+        async def send_one(review) -> bool:
+            async with semaphore:
+                return await wb_api.send_reply(
+                    feedback_id=review.source_api_id,
+                    text=auto_reply
+                )
 
-            except Exception as e:
-                logger.error(f"Error processing auto-reply for review {review.source_api_id}: {e}", exc_info=True)
+        results = await asyncio.gather(
+            *(send_one(review) for review in candidates),
+            return_exceptions=True
+        )
 
-        # Сохраняем изменения в БД
-        if auto_replied_count > 0:
-            session.commit()
+        replied_ids = []
+        for review, result in zip(candidates, results):
+            if isinstance(result, Exception):
+                logger.error(f"Error processing auto-reply for review {review.source_api_id}: {result}",
+                             exc_info=result)
+            elif result:
+                replied_ids.append(review.id)
+                logger.info(f"Auto-replied to review {review.source_api_id}")
+            else:
+                logger.error(f"Failed to auto-reply to review {review.source_api_id}")
+
+        # Обновляем статус всех отвеченных отзывов одним запросом
+        if replied_ids:
+            async with Session() as session:
+                await session.execute(
+                    update(Review)
+                    .where(Review.id.in_(replied_ids))
+                    .values(is_answered=True, response=auto_reply)
+                    .execution_options(synchronize_session=False)
+                )
+                await session.commit()
 
-        return auto_replied_count
+        return len(replied_ids)
 
     except Exception as e:
         logger.error(f"Error in process_auto_replies: {e}", exc_info=True)
         return 0
 
 
+@lru_cache(maxsize=1024)
+def _review_detail_markup(review_id: str, photo_count: int = 0) -> InlineKeyboardMarkup:
+    """
+    Клавиатура карточки отзыва (строится один раз для каждого отзыва)
+
+    Args:
+        review_id: ID отзыва в базе данных
+        photo_count: Количество фотографий в отзыве
+
+    Returns:
+        InlineKeyboardMarkup: Клавиатура с вариантами действий
+    """
+    builder = InlineKeyboardBuilder()
+
+    # Добавляем кнопку "Показать все фото", если есть больше одной фотографии
+    if photo_count > 1:
+        builder.button(text=f"📷 Показать все фото ({photo_count})",
+                       callback_data=f"show_photos_{review_id}")
+
+    builder.button(text="✍️ Ручной ответ", callback_data=f"manual_{review_id}")
+    builder.button(text="🤖 Автогенерация", callback_data=f"generate_{review_id}")
+    builder.button(text="◀️ Назад", callback_data="pending_reviews")
+    builder.adjust(1)  # Одна кнопка в строке
+    return builder.as_markup()
+
+
+@lru_cache(maxsize=1024)
+def _generation_markup(review_id: str) -> InlineKeyboardMarkup:
+    """
+    Клавиатура под сгенерированным ответом (строится один раз для каждого отзыва)
+
+    Args:
+        review_id: ID отзыва в базе данных
+
+    Returns:
+        InlineKeyboardMarkup: Клавиатура с вариантами действий
+    """
+    builder = InlineKeyboardBuilder()
+    builder.button(text="🔄 Сгенерировать заново", callback_data="regenerate")
+    builder.button(text="✍️ Ручной ответ", callback_data="write_own")
+    builder.button(text="✅ Отправить", callback_data="send_reply")
+    builder.button(text="◀️ Назад", callback_data=f"review_{review_id}")
+    builder.adjust(1)
+    return builder.as_markup()
+
+
+@lru_cache(maxsize=1024)
+def _back_markup(review_id: str) -> InlineKeyboardMarkup:
+    """
+    Клавиатура с кнопкой возврата к отзыву
+
+    Args:
+        review_id: ID отзыва в базе данных
+
+    Returns:
+        InlineKeyboardMarkup: Клавиатура с кнопкой "Назад"
+    """
+    builder = InlineKeyboardBuilder()
+    builder.button(text="◀️ Назад", callback_data=f"review_{review_id}")
+    return builder.as_markup()
+
+
+@lru_cache(maxsize=1024)
+def _back_to_review_markup(review_id: str) -> InlineKeyboardMarkup:
+    """
+    Клавиатура под альбомом с фотографиями отзыва
+
+    Args:
+        review_id: ID отзыва в базе данных
+
+    Returns:
+        InlineKeyboardMarkup: Клавиатура с кнопкой "Назад к отзыву"
+    """
+    builder = InlineKeyboardBuilder()
+    builder.button(text="◀️ Назад к отзыву", callback_data=f"review_{review_id}")
+    return builder.as_markup()
+
+
+@lru_cache(maxsize=1024)
+def _skip_solution_markup(review_id: str) -> InlineKeyboardMarkup:
+    """
+    Клавиатура запроса решения проблемы
+
+    Args:
+        review_id: ID отзыва в базе данных
+
+    Returns:
+        InlineKeyboardMarkup: Клавиатура с кнопками "Пропустить" и "Назад"
+    """
+    builder = InlineKeyboardBuilder()
+    builder.button(text="⏭ Пропустить", callback_data="skip_solution")
+    builder.button(text="◀️ Назад", callback_data=f"review_{review_id}")
+    builder.adjust(1)
+    return builder.as_markup()
+
+
+@lru_cache(maxsize=1024)
+def _confirm_reply_markup(review_id: str) -> InlineKeyboardMarkup:
+    """
+    Клавиатура предпросмотра собственного ответа
+
+    Args:
+        review_id: ID отзыва в базе данных
+
+    Returns:
+        InlineKeyboardMarkup: Клавиатура с кнопками "Отправить ответ" и "Назад"
+    """
+    builder = InlineKeyboardBuilder()
+    builder.button(text="✅ Отправить ответ", callback_data="send_reply")
+    builder.button(text="◀️ Назад", callback_data=f"review_{review_id}")
+    builder.adjust(1)
+    return builder.as_markup()
+
+
+@lru_cache(maxsize=1024)
+def _retry_send_markup(review_id: str) -> InlineKeyboardMarkup:
+    """
+    Клавиатура после неудачной отправки ответа
+
+    Args:
+        review_id: ID отзыва в базе данных
+
+    Returns:
+        InlineKeyboardMarkup: Клавиатура с кнопками "Повторить" и "Назад"
+    """
+    builder = InlineKeyboardBuilder()
+    builder.button(text="🔄 Повторить", callback_data="send_reply")
+    builder.button(text="◀️ Назад", callback_data=f"review_{review_id}")
+    builder.adjust(1)
+    return builder.as_markup()
+
+
+# Клавиатура уведомления о новых отзывах (не зависит от данных, строится один раз)
+_NEW_REVIEWS_MARKUP = (
+    InlineKeyboardBuilder()
+    .button(text="📋 Посмотреть отзывы", callback_data="pending_reviews")
+    .as_markup()
+)
+
+# Клавиатура после успешной отправки ответа
+_REPLY_SENT_MARKUP = (
+    InlineKeyboardBuilder()
+    .button(text="📋 Список отзывов", callback_data="pending_reviews")
+    .button(text="🏠 Главное меню", callback_data="start")
+    .adjust(1)
+    .as_markup()
+)
+
+
 # ============ Обработчики команд и колбэков ============
 
 @router.callback_query(F.data == "pending_reviews")
-async def reviews_list_handler(callback: types.CallbackQuery, state: FSMContext):
+async def reviews_list_handler(callback: types.CallbackQuery, state: FSMContext, refresh: bool = True):
     """
     Обработчик для показа списка неотвеченных отзывов
 
     Args:
         callback: Колбэк от кнопки
         state: Состояние FSM
+        refresh: Проверить новые отзывы перед показом (при пагинации не нужно)
     """
     # Показываем индикатор загрузки
     await callback.answer("Загрузка отзывов...")
@@ -373,15 +876,16 @@ async def reviews_list_handler(callback: types.CallbackQuery, state: FSMContext)
             # Обычное текстовое сообщение, можем редактировать
             need_new_message = False
 
-        # Обновляем список отзывов
-        await check_new_reviews(callback.bot)
+        # Обновляем отзывы только текущего пользователя в фоне (остальных проверяет планировщик)
+        if refresh:
+            _schedule_user_sync(callback.from_user.id, callback.bot)
 
         user_id = callback.from_user.id
         items_per_page = 5
 
-        with Session() as session:
+        async with Session() as session:
             # Проверяем настройки пользователя
-            user = session.get(UserSettings, user_id)
+            user = await session.get(UserSettings, user_id)
             if not user or not user.wb_api_key:
                 if need_new_message:
                     await callback.message.answer(
@@ -390,30 +894,28 @@ async def reviews_list_handler(callback: types.CallbackQuery, state: FSMContext)
                         parse_mode="Markdown"
                     )
                 else:
-                    await callback.message.edit_text(
+                    await _edit_text(
+                        callback.message,
                         "🔑 Для работы с отзывами необходимо настроить API-ключ в разделе настроек.",
                         reply_markup=back_button_auto2(),
                         parse_mode="Markdown"
                     )
                 return
 
-            # Получаем отзывы из БД
-            db_reviews = session.query(Review).filter(
+            # Неотвеченные отзывы пользователя, в которых есть какая-либо информация
+            pending_filter = (
                 Review.user_id == user_id,
-                Review.is_answered == False
-            ).order_by(Review.id.desc()).all()
-
-            # Фильтруем пустые отзывы
-            filtered_reviews = []
-            for r in db_reviews:
-                if ((r.comment and r.comment.strip()) or
-                        (r.pros and r.pros.strip() and r.pros.lower() != "не указаны") or
-                        (r.cons and r.cons.strip() and r.cons.lower() != "не указаны") or
-                        r.photo_url):
-                    filtered_reviews.append(r)
+                Review.is_answered == False,
+                _HAS_CONTENT
+            )
+
+            # Считаем отзывы на стороне БД
+            total_reviews = await session.scalar(
+                select(func.count(Review.id)).where(*pending_filter)
+            )
 
             # Если нет отзывов, показываем соответствующее сообщение
-            if not filtered_reviews:
+            if not total_reviews:
                 if need_new_message:
                     await callback.message.answer(
                         "✅ Все отзывы обработаны!",
@@ -421,7 +923,8 @@ async def reviews_list_handler(callback: types.CallbackQuery, state: FSMContext)
                         parse_mode="Markdown"
                     )
                 else:
-                    await callback.message.edit_text(
+                    await _edit_text(
+                        callback.message,
                         "✅ Все отзывы обработаны!",
                         reply_markup=back_button_auto3(),
                         parse_mode="Markdown"
@@ -432,14 +935,21 @@ async def reviews_list_handler(callback: types.CallbackQuery, state: FSMContext)
             current_page = data.get("page", 0)
 
             # Вычисляем общее количество страниц
-            total_pages = (len(filtered_reviews) + items_per_page - 1) // items_per_page
+            total_pages = (total_reviews + items_per_page - 1) // items_per_page
 
             # Корректируем номер страницы
             if current_page >= total_pages:
                 current_page = 0
 
-            start_idx = current_page * items_per_page
-            end_idx = min(start_idx + items_per_page, len(filtered_reviews))
+            # Загружаем из БД только отзывы текущей страницы
+            page_reviews = (await session.scalars(
+                select(Review).where(*pending_filter).order_by(Review.id.desc()).limit(
+                    items_per_page
+                ).offset(current_page * items_per_page)
+            )).all()
+
+            # Кэшируем строки страницы: переход к отзыву не потребует запроса к БД
+            _cache_review_rows(user_id, page_reviews)
 
             # Подготавливаем данные для отображения
             text = "📋 *Список неотвеченных отзывов*\n\nВыберите отзыв для ответа:"
@@ -447,35 +957,30 @@ async def reviews_list_handler(callback: types.CallbackQuery, state: FSMContext)
             # Строим клавиатуру с отзывами
             builder = InlineKeyboardBuilder()
 
-            for review in filtered_reviews[start_idx:end_idx]:
+            for review in page_reviews:
                 # Формируем превью отзыва в компактном формате
-                stars = "⭐" * review.stars  # Звезды в виде эмодзи
+                stars = _STAR_STRINGS[min(review.stars or 0, 5)]  # Звезды в виде эмодзи
 
                 # Добавляем иконку фото только если у отзыва действительно есть фотографии
-                has_real_photos = False
-                if review.photo_url and review.photo_urls:
-                    try:
-                        photo_urls = json.loads(review.photo_urls)
-                        has_real_photos = bool(photo_urls)
-                    except:
-                        has_real_photos = False
+                has_real_photos = bool(review.photo_url and review.photo_count)
 
                 photo_icon = "📸 " if has_real_photos else ""
 
-                # Создаем текст кнопки в формате: "⭐⭐⭐⭐⭐ 📸"
-                btn_text = f"{stars} {photo_icon}"
+                # Текст кнопки в формате: "⭐⭐⭐⭐⭐ 📸"
+                prefix = f"{stars} {photo_icon}"
+                comment_preview = ""
 
                 # Добавляем короткое превью комментария, если есть место
-                if review.comment and len(btn_text) < 45:
+                if review.comment and len(prefix) < 45:
                     # Обрезаем комментарий
-                    max_comment_length = 45 - len(btn_text)
+                    max_comment_length = 45 - len(prefix)
                     if len(review.comment) > max_comment_length:
                         comment_preview = review.comment[:max_comment_length] + "..."
                     else:
                         comment_preview = review.comment
 
-                    # Добавляем комментарий к тексту кнопки
-                    btn_text += comment_preview
+                # Собираем текст кнопки за одну операцию
+                btn_text = f"{prefix}{comment_preview}"
 
                 builder.button(
                     text=btn_text,
@@ -519,7 +1024,8 @@ async def reviews_list_handler(callback: types.CallbackQuery, state: FSMContext)
                     parse_mode="Markdown"
                 )
             else:
-                await callback.message.edit_text(
+                await _edit_text(
+                    callback.message,
                     text,
                     reply_markup=builder.as_markup(),
                     parse_mode="Markdown"
@@ -540,7 +1046,60 @@ async def reviews_list_handler(callback: types.CallbackQuery, state: FSMContext)
             pass
 
 
-@router.callback_query(F.data.startswith("page_"))
+async def _edit_text(
+        message: types.Message,
+        text: str,
+        reply_markup: Optional[InlineKeyboardMarkup] = None,
+        **kwargs
+):
+    """
+    Редактирует сообщение, пропуская запрос, если оно уже показывает тот же текст и клавиатуру
+
+    Повтор отрисовки пропускается, только если сообщение в колбэке совпадает с тем,
+    что вернул Telegram после нашего редактирования (его не изменили другие обработчики)
+
+    Args:
+        message: Редактируемое сообщение
+        text: Новый текст
+        reply_markup: Новая клавиатура
+        **kwargs: Остальные параметры edit_text
+
+    Returns:
+        Результат edit_text или исходное сообщение, если редактирование не требовалось
+    """
+    key = (message.chat.id, message.message_id)
+    markup_json = reply_markup.model_dump_json() if reply_markup else None
+    fingerprint = hash((text, kwargs.get("parse_mode"), markup_json))
+
+    rendered = _last_render.get(key)
+    current_markup_json = message.reply_markup.model_dump_json() if message.reply_markup else None
+    if rendered == (fingerprint, message.text) and current_markup_json == markup_json:
+        return message
+
+    result = await message.edit_text(text, reply_markup=reply_markup, **kwargs)
+
+    # Вытесняем самую старую отрисовку при переполнении
+    if len(_last_render) >= _LAST_RENDER_SIZE and key not in _last_render:
+        _last_render.pop(next(iter(_last_render)))
+    # edit_text возвращает отредактированное сообщение (или True для inline-сообщений)
+    _last_render[key] = (fingerprint, getattr(result, "text", None))
+    return result
+
+
+async def _delete_message(message: types.Message) -> None:
+    """
+    Удаляет сообщение, не прерывая обработчик при ошибке
+
+    Args:
+        message: Сообщение для удаления
+    """
+    try:
+        await message.delete()
+        logger.info("Previous message deleted")
+    except Exception as e:
+        logger.error(f"Error deleting previous message: {e}")
+
+
 async def handle_pagination(callback: types.CallbackQuery, state: FSMContext):
     """
     Обработчик пагинации списка отзывов
@@ -569,14 +1128,14 @@ async def handle_pagination(callback: types.CallbackQuery, state: FSMContext):
             except Exception as e:
                 logger.error(f"Error deleting message with photo during pagination: {e}")
 
-        # Вызываем стандартный обработчик списка отзывов с обновленной страницей
-        await reviews_list_handler(callback, state)
+        # Вызываем стандартный обработчик списка отзывов с обновленной страницей,
+        # не обращаясь к API: пагинация только читает БД
+        await reviews_list_handler(callback, state, refresh=False)
 
     except Exception as e:
         logger.error(f"Error in handle_pagination: {e}", exc_info=True)
         await callback.answer("❌ Ошибка при переключении страницы", show_alert=True)
 
-@router.callback_query(F.data.startswith("review_"))
 async def review_detail_handler(callback: types.CallbackQuery, state: FSMContext):
     """
     Обработчик для показа детальной информации об отзыве
@@ -591,113 +1150,90 @@ async def review_detail_handler(callback: types.CallbackQuery, state: FSMContext
         user_id = callback.from_user.id
 
         # Получаем данные отзыва из БД
-        with Session() as session:
-            review = session.query(Review).filter_by(
-                source_api_id=review_id,
-                user_id=user_id,
-                is_answered=False
-            ).first()
-
-            if not review:
-                await callback.message.edit_text(
+        async with Session() as session:
+            review = await _get_review_row(session, user_id, review_id)
+
+            if not review or review.is_answered:
+                await _edit_text(
+                    callback.message,
                     "❌ Отзыв не найден или уже был обработан.",
                     reply_markup=back_button_auto3()
                 )
                 return
 
             # Формируем текст с информацией об отзыве
-            stars_text = "⭐" * review.stars
+            stars_text = _STAR_STRINGS[min(review.stars or 0, 5)]
 
             # Используем артикул продавца supplierArticle
             supplier_article = review.supplier_article if review.supplier_article else "Не указан"
             product_name = review.product_name if review.product_name else ""
 
-            review_text = f"*Артикул:* {supplier_article}\n"
+            # Собираем текст из частей, чтобы не копировать строку при каждом добавлении
+            parts = [f"*Артикул:* {supplier_article}\n"]
 
             if product_name:
-                review_text += f"*Товар:* {product_name}\n"
+                parts.append(f"*Товар:* {product_name}\n")
 
-            review_text += f"\n{stars_text}\n\n"
+            parts.append(f"\n{stars_text}\n\n")
 
             if review.comment and review.comment.strip():
-                review_text += f"*Комментарий:*\n{review.comment}\n\n"
+                parts.append(f"*Комментарий:*\n{review.comment}\n\n")
 
             if review.pros and review.pros.strip() and review.pros.lower() != "не указаны":
-                review_text += f"*Достоинства:*\n{review.pros}\n\n"
+                parts.append(f"*Достоинства:*\n{review.pros}\n\n")
 
             if review.cons and review.cons.strip() and review.cons.lower() != "не указаны":
-                review_text += f"*Недостатки:*\n{review.cons}\n\n"
-
-            # Проверяем наличие фотографий в базе данных
-            has_photos = review.photo_url
-            photo_urls = []
+                parts.append(f"*Недостатки:*\n{review.cons}\n\n")
 
-            if has_photos and review.photo_urls:
-                try:
-                    # Парсим JSON-строку с URL фотографий
-                    photo_urls = json.loads(review.photo_urls)
-                    logger.info(f"Parsed photo_urls from DB: {photo_urls}")
-
-                    if not photo_urls:
-                        logger.warning("Empty photo_urls list after parsing")
-
-                        # Если в БД не сохранены фотографии, но флаг установлен,
-                        # попробуем получить фотографии напрямую из API
-                        try:
-                            # Получаем API-ключ пользователя
-                            user = session.get(UserSettings, user_id)
-                            if user and user.wb_api_key:
-                                # Инициализируем API
-                                wb_api = WildberriesAPI(user.wb_api_key)
-
-                                # Получаем отзыв напрямую из API
-                                api_review = await wb_api.get_review_by_id(review_id)
-
-                                if api_review:
-                                    # Извлекаем URL фотографий
-                                    photo_urls = wb_api._extract_photo_links(api_review)
-
-                                    if photo_urls:
-                                        logger.info(f"Retrieved {len(photo_urls)} photos from API")
-
-                                        # Обновляем информацию в базе данных
-                                        review.photo_urls = json.dumps(photo_urls)
-                                        session.commit()
-                                        logger.info(f"Updated photo_urls in DB for review {review_id}")
-                                        has_photos = True
-                        except Exception as api_error:
-                            logger.error(f"Error getting photos from API: {api_error}")
-
-                except Exception as e:
-                    logger.error(f"Error parsing photo URLs: {e}")
-                    has_photos = False
-
-            # Создаем клавиатуру с вариантами действий
-            builder = InlineKeyboardBuilder()
+            review_text = "".join(parts)
 
-            # Добавляем кнопку "Показать все фото", если есть больше одной фотографии
-            if has_photos and len(photo_urls) > 1:
-                builder.button(text=f"📷 Показать все фото ({len(photo_urls)})",
-                               callback_data=f"show_photos_{review_id}")
+            # Проверяем наличие фотографий в базе данных (список URL уже разобран из JSON)
+            has_photos = review.photo_url
+            photo_urls = (review.photo_urls or []) if has_photos else []
 
-            builder.button(text="✍️ Ручной ответ", callback_data=f"manual_{review_id}")
-            builder.button(text="🤖 Автогенерация", callback_data=f"generate_{review_id}")
-            builder.button(text="◀️ Назад", callback_data="pending_reviews")
-            builder.adjust(1)  # Одна кнопка в строке
+            if has_photos and not photo_urls:
+                logger.warning("Empty photo_urls list in DB")
 
-            # Удаляем предыдущее сообщение, если это callback
-            try:
-                await callback.message.delete()
-                logger.info("Previous message deleted")
-            except Exception as e:
-                logger.error(f"Error deleting previous message: {e}")
+                # Если в БД не сохранены фотографии, но флаг установлен,
+                # попробуем получить фотографии напрямую из API
+                try:
+                    # Ищем отзыв среди неотвеченных отзывов из API
+                    api_review = await get_review(user_id, review_id)
+
+                    if api_review:
+                        # URL фотографий уже извлечены при нормализации
+                        photo_urls = api_review["photo_urls"]
+
+                        if photo_urls:
+                            logger.info(f"Retrieved {len(photo_urls)} photos from API")
+
+                            # Обновляем информацию в базе данных (объект может быть взят из кэша,
+                            # поэтому пишем явным UPDATE и обновляем его атрибуты)
+                            await session.execute(
+                                update(Review)
+                                .where(Review.id == review.id)
+                                .values(photo_urls=photo_urls, photo_count=len(photo_urls))
+                                .execution_options(synchronize_session=False)
+                            )
+                            await session.commit()
+                            review.photo_urls = photo_urls
+                            review.photo_count = len(photo_urls)
+                            logger.info(f"Updated photo_urls in DB for review {review_id}")
+                except Exception as api_error:
+                    logger.error(f"Error getting photos from API: {api_error}")
+
+            # Клавиатура с вариантами действий
+            markup = _review_detail_markup(review_id, len(photo_urls) if has_photos else 0)
+
+            # Удаляем предыдущее сообщение параллельно с отправкой нового
+            delete_task = asyncio.create_task(_delete_message(callback.message))
 
             # Если нет фотографий, отправляем только текст
             if not has_photos or not photo_urls:
                 logger.info("No photos to display, sending text only")
                 await callback.message.answer(
                     review_text,
-                    reply_markup=builder.as_markup(),
+                    reply_markup=markup,
                     parse_mode="Markdown"
                 )
             else:
@@ -716,7 +1252,7 @@ async def review_detail_handler(callback: types.CallbackQuery, state: FSMContext
                     sent_message = await callback.message.answer_photo(
                         photo=photo_urls[0],
                         caption=review_text,
-                        reply_markup=builder.as_markup(),
+                        reply_markup=markup,
                         parse_mode="Markdown"
                     )
                     logger.info(f"Photo with caption sent: message_id={sent_message.message_id}")
@@ -726,13 +1262,16 @@ async def review_detail_handler(callback: types.CallbackQuery, state: FSMContext
                     # В случае ошибки отправляем только текст
                     await callback.message.answer(
                         f"{review_text}\n\n_Ошибка загрузки фотографии_",
-                        reply_markup=builder.as_markup(),
+                        reply_markup=markup,
                         parse_mode="Markdown"
                     )
 
-            # Сохраняем ID отзыва в состоянии
-            await state.update_data(review_id=review_id, regeneration_count=0,
-                                    has_photo=has_photos and bool(photo_urls))
+            # Сохраняем ID отзыва в состоянии и дожидаемся удаления предыдущего сообщения
+            await asyncio.gather(
+                delete_task,
+                state.update_data(review_id=review_id, regeneration_count=0,
+                                  has_photo=has_photos and bool(photo_urls))
+            )
     except Exception as e:
         logger.error(f"Error in review_detail_handler: {e}", exc_info=True)
         await callback.answer("❌ Произошла ошибка при загрузке отзыва", show_alert=True)
@@ -762,65 +1301,64 @@ async def show_all_photos_handler(callback: types.CallbackQuery, state: FSMConte
         logger.info(f"Showing all photos for review {review_id}")
 
         # Получаем данные отзыва из БД
-        with Session() as session:
-            review = session.query(Review).filter_by(
-                source_api_id=review_id,
-                user_id=user_id
-            ).first()
-
-            if not review or not review.photo_urls:
-                await callback.answer("Фотографии не найдены", show_alert=True)
-                return
+        async with Session() as session:
+            review = await _get_review_row(session, user_id, review_id)
+
+        # Список URL фотографий уже разобран из JSON-колонки; проверяем адреса один раз,
+        # ограничивая альбом максимальным для Telegram размером
+        photo_urls = [
+            url for url in (review.photo_urls or [] if review else [])
+            if isinstance(url, str) and url.startswith("http")
+        ][:_MEDIA_GROUP_LIMIT]
+        if not photo_urls:
+            await callback.answer("Фотографии не найдены", show_alert=True)
+            return
 
-            # Парсим JSON-строку с URL фотографий
-            try:
-                photo_urls = json.loads(review.photo_urls)
-                if not photo_urls:
-                    await callback.answer("Фотографии не найдены", show_alert=True)
-                    return
-
-                logger.info(f"Preparing to show {len(photo_urls)} photos")
-
-                # Создаем медиагруппу из всех фотографий
-                media_group = []
-                for i, photo_url in enumerate(photo_urls):
-                    try:
-                        caption = f"Фото {i + 1}/{len(photo_urls)}" if i == 0 else ""
-                        media_group.append(types.InputMediaPhoto(
-                            media=photo_url,
-                            caption=caption
-                        ))
-                    except Exception as e:
-                        logger.error(f"Error adding photo to media group: {e}", exc_info=True)
-
-                if not media_group:
-                    await callback.answer("Ошибка подготовки фотографий", show_alert=True)
-                    return
-
-                # Отправляем альбом с фотографиями
-                await callback.bot.send_media_group(
-                    chat_id=callback.message.chat.id,
-                    media=media_group
+        logger.info(f"Preparing to show {len(photo_urls)} photos")
+
+        try:
+            # Альбом должен содержать от 2 до 10 элементов: одну фотографию отправляем отдельно,
+            # сразу с кнопкой "Назад к отзыву"
+            if len(photo_urls) == 1:
+                await callback.message.answer_photo(
+                    photo=photo_urls[0],
+                    caption="Фото 1/1",
+                    reply_markup=_back_to_review_markup(review_id)
                 )
+                return
 
-                # Отправляем кнопку "Назад к отзыву"
-                await callback.message.answer(
-                    "Фотографии к отзыву:",
-                    reply_markup=InlineKeyboardBuilder()
-                    .button(text="◀️ Назад к отзыву", callback_data=f"review_{review_id}")
-                    .as_markup()
+            # Создаем медиагруппу; подпись ставим на последнюю фотографию, под которой окажется кнопка
+            total = len(photo_urls)
+            media_group = [
+                types.InputMediaPhoto(
+                    media=photo_url,
+                    caption=f"Фото {total}/{total} — нажмите «Назад к отзыву» ниже" if i == total - 1 else None
                 )
+                for i, photo_url in enumerate(photo_urls)
+            ]
 
-            except Exception as e:
-                logger.error(f"Error parsing or sending photos: {e}", exc_info=True)
-                await callback.answer("Ошибка загрузки фотографий", show_alert=True)
+            # Отправляем альбом с фотографиями
+            album = await callback.bot.send_media_group(
+                chat_id=callback.message.chat.id,
+                media=media_group
+            )
+
+            # Кнопку "Назад к отзыву" нельзя прикрепить к альбому, поэтому отправляем ее ответом на него
+            await callback.message.answer(
+                "Фотографии к отзыву:",
+                reply_markup=_back_to_review_markup(review_id),
+                reply_parameters=types.ReplyParameters(message_id=album[-1].message_id) if album else None
+            )
+
+        except Exception as e:
+            logger.error(f"Error sending photos: {e}", exc_info=True)
+            await callback.answer("Ошибка загрузки фотографий", show_alert=True)
 
     except Exception as e:
         logger.error(f"Error in show_all_photos_handler: {e}", exc_info=True)
         await callback.answer("Произошла ошибка при загрузке фотографий", show_alert=True)
 
 
-@router.callback_query(F.data.startswith("manual_"))
 async def start_manual_reply(callback: types.CallbackQuery, state: FSMContext):
     """
     Обработчик для начала ручного ответа на отзыв
@@ -836,15 +1374,12 @@ async def start_manual_reply(callback: types.CallbackQuery, state: FSMContext):
         # Сохраняем ID отзыва в состоянии
         await state.update_data(review_id=review_id)
 
-        # Создаем клавиатуру с кнопкой возврата
-        builder = InlineKeyboardBuilder()
-        builder.button(text="◀️ Назад", callback_data=f"review_{review_id}")
-
         # Запрашиваем текст ответа
-        await callback.message.edit_text(
+        await _edit_text(
+            callback.message,
             "✍️ *Напишите ваш ответ на отзыв:*\n\n"
             "Отправьте текстовое сообщение с вашим ответом.",
-            reply_markup=builder.as_markup(),
+            reply_markup=_back_markup(review_id),
             parse_mode="Markdown"
         )
 
@@ -856,7 +1391,6 @@ async def start_manual_reply(callback: types.CallbackQuery, state: FSMContext):
         await callback.answer("❌ Ошибка при запуске ручного ответа", show_alert=True)
 
 
-@router.callback_query(F.data.startswith("generate_"))
 async def start_generation_flow(callback: types.CallbackQuery, state: FSMContext):
     """
     Обработчик для начала процесса автогенерации ответа
@@ -872,16 +1406,13 @@ async def start_generation_flow(callback: types.CallbackQuery, state: FSMContext
         # Сохраняем ID отзыва в состоянии
         await state.update_data(review_id=review_id)
 
-        # Создаем клавиатуру с кнопкой возврата
-        builder = InlineKeyboardBuilder()
-        builder.button(text="◀️ Назад", callback_data=f"review_{review_id}")
-
         # Запрашиваем аргументы для ответа
-        await callback.message.edit_text(
+        await _edit_text(
+            callback.message,
             "📝 *Введите аргументы для ответа:*\n\n"
             "Укажите через запятую ключевые моменты, которые хотите включить в ответ.\n"
             "Например: _благодарность за выбор, индивидуальный подход, качество товаров_",
-            reply_markup=builder.as_markup(),
+            reply_markup=_back_markup(review_id),
             parse_mode="Markdown"
         )
 
@@ -913,18 +1444,12 @@ async def process_review_arguments(message: types.Message, state: FSMContext):
         data = await state.get_data()
         review_id = data.get("review_id")
 
-        # Создаем клавиатуру для выбора действий
-        builder = InlineKeyboardBuilder()
-        builder.button(text="⏭ Пропустить", callback_data="skip_solution")
-        builder.button(text="◀️ Назад", callback_data=f"review_{review_id}")
-        builder.adjust(1)
-
         # Запрашиваем решение проблемы
         await message.answer(
             "💡 *Хотите предложить решение проблемы?*\n\n"
             "Опишите, как вы планируете решить проблему клиента, если она есть, "
             "или нажмите 'Пропустить', если в этом нет необходимости.",
-            reply_markup=builder.as_markup(),
+            reply_markup=_skip_solution_markup(review_id),
             parse_mode="Markdown"
         )
 
@@ -938,12 +1463,9 @@ async def process_review_arguments(message: types.Message, state: FSMContext):
         data = await state.get_data()
         review_id = data.get("review_id")
 
-        builder = InlineKeyboardBuilder()
-        builder.button(text="◀️ Назад", callback_data=f"review_{review_id}")
-
         await message.answer(
             "❌ Произошла ошибка. Попробуйте ещё раз.",
-            reply_markup=builder.as_markup()
+            reply_markup=_back_markup(review_id)
         )
 
 
@@ -991,16 +1513,54 @@ async def process_solution(message: types.Message, state: FSMContext):
         data = await state.get_data()
         review_id = data.get("review_id")
 
-        builder = InlineKeyboardBuilder()
-        builder.button(text="◀️ Назад", callback_data=f"review_{review_id}")
-
         await message.answer(
             "❌ Произошла ошибка. Попробуйте ещё раз.",
-            reply_markup=builder.as_markup()
+            reply_markup=_back_markup(review_id)
         )
 
 
 async def process_generation(source: Union[types.Message, types.CallbackQuery], state: FSMContext):
+    """
+    Запускает генерацию ответа на отзыв в фоне
+
+    Обработчик возвращается сразу, не задерживая остальные обновления,
+    а генерации одного пользователя выполняются по очереди
+
+    Args:
+        source: Источник события (сообщение или колбэк)
+        state: Состояние FSM
+    """
+    task = asyncio.create_task(_generate_in_order(source, state))
+    _generation_tasks.add(task)
+    task.add_done_callback(_on_generation_done)
+
+
+def _on_generation_done(task: asyncio.Task) -> None:
+    """
+    Убирает завершенную задачу генерации и логирует ее необработанную ошибку
+
+    Args:
+        task: Завершенная задача
+    """
+    _generation_tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logger.error(f"Generation task failed: {task.exception()}", exc_info=task.exception())
+
+
+async def _generate_in_order(source: Union[types.Message, types.CallbackQuery], state: FSMContext):
+    """
+    Выполняет генерацию под блокировкой пользователя
+
+    Args:
+        source: Источник события (сообщение или колбэк)
+        state: Состояние FSM
+    """
+    lock = _generation_locks.setdefault(source.from_user.id, asyncio.Lock())
+    async with lock:
+        await _generate(source, state)
+
+
+async def _generate(source: Union[types.Message, types.CallbackQuery], state: FSMContext):
     """
     Обрабатывает генерацию ответа на отзыв
 
@@ -1018,21 +1578,28 @@ async def process_generation(source: Union[types.Message, types.CallbackQuery],
             raise ValueError("Review ID not found in state")
 
         # Получаем данные пользователя и отзыва
-        with Session() as session:
+        async with Session() as session:
             user_id = source.from_user.id
-            user = session.get(UserSettings, user_id)
+            review = _cached_review_row(user_id, review_id)
 
-            if not user:
-                raise ValueError(f"User {user_id} not found")
+            if review is not None:
+                user = await session.get(UserSettings, user_id)
+            else:
+                # Отзыва нет в кэше: загружаем отзыв и настройки пользователя одним запросом
+                row = (await session.execute(
+                    select(Review, UserSettings)
+                    .join(UserSettings, UserSettings.user_id == Review.user_id)
+                    .where(Review.source_api_id == review_id, Review.user_id == user_id)
+                )).first()
 
-            # Получаем отзыв из базы данных
-            review = session.query(Review).filter_by(
-                source_api_id=review_id,
-                user_id=user_id
-            ).first()
+                if not row:
+                    raise ValueError(f"Review {review_id} not found for user {user_id}")
 
-            if not review:
-                raise ValueError(f"Review {review_id} not found for user {user_id}")
+                review, user = row
+                _cache_review_rows(user_id, [review])
+
+            if not user:
+                raise ValueError(f"User {user_id} not found")
 
             # Преобразуем отзыв в словарь для совместимости с build_prompt
             review_dict = {
@@ -1057,29 +1624,25 @@ async def process_generation(source: Union[types.Message, types.CallbackQuery],
                 prompt += "\n\nПопробуй написать другими словами:"
                 await state.update_data(is_regenerate=False)
 
-            # Генерируем ответ
-            generated_reply = generate_reply(prompt)
+            # Генерируем ответ (при регенерации кэш не используем, нужен новый вариант)
+            generated_reply = (await generate_reply_batch([prompt], use_cache=not is_regenerate))[0]
             await state.update_data(generated_reply=generated_reply)
 
-            # Создаем клавиатуру с вариантами действий
-            builder = InlineKeyboardBuilder()
-            builder.button(text="🔄 Сгенерировать заново", callback_data="regenerate")
-            builder.button(text="✍️ Ручной ответ", callback_data="write_own")
-            builder.button(text="✅ Отправить", callback_data="send_reply")
-            builder.button(text="◀️ Назад", callback_data=f"review_{review_id}")
-            builder.adjust(1)
+            # Клавиатура с вариантами действий
+            markup = _generation_markup(review_id)
 
             # Отправляем сгенерированный ответ
             if isinstance(source, types.Message):
                 await source.answer(
                     f"🤖 *Сгенерированный ответ:*\n\n{generated_reply}",
-                    reply_markup=builder.as_markup(),
+                    reply_markup=markup,
                     parse_mode="Markdown"
                 )
             else:  # CallbackQuery
-                await source.message.edit_text(
+                await _edit_text(
+                    source.message,
                     f"🤖 *Сгенерированный ответ:*\n\n{generated_reply}",
-                    reply_markup=builder.as_markup(),
+                    reply_markup=markup,
                     parse_mode="Markdown"
                 )
 
@@ -1092,19 +1655,16 @@ async def process_generation(source: Union[types.Message, types.CallbackQuery],
             data = await state.get_data()
             review_id = data.get("review_id")
 
-            builder = InlineKeyboardBuilder()
-            builder.button(text="◀️ Назад", callback_data=f"review_{review_id}")
-
             if isinstance(source, types.Message):
-                await source.answer(error_msg, reply_markup=builder.as_markup())
+                await source.answer(error_msg, reply_markup=_back_markup(review_id))
             else:  # CallbackQuery
-                await source.message.edit_text(error_msg, reply_markup=builder.as_markup())
+                await _edit_text(source.message, error_msg, reply_markup=_back_markup(review_id))
         except Exception:
             # Базовое сообщение об ошибке, если не удалось сформировать клавиатуру
             if isinstance(source, types.Message):
                 await source.answer(error_msg)
             else:  # CallbackQuery
-                await source.message.edit_text(error_msg)
+                await _edit_text(source.message, error_msg)
 
 
 @router.message(ReviewState.waiting_for_custom_reply)
@@ -1133,17 +1693,11 @@ async def process_custom_reply(message: types.Message, state: FSMContext):
         # Сохраняем пользовательский ответ
         await state.update_data(generated_reply=message.text)
 
-        # Создаем клавиатуру для подтверждения отправки
-        builder = InlineKeyboardBuilder()
-        builder.button(text="✅ Отправить ответ", callback_data="send_reply")
-        builder.button(text="◀️ Назад", callback_data=f"review_{review_id}")
-        builder.adjust(1)
-
         # Показываем предпросмотр ответа
         await message.answer(
             f"📝 *Ваш ответ:*\n\n{message.text}\n\n"
             "Нажмите 'Отправить ответ' для отправки или 'Назад' для возврата.",
-            reply_markup=builder.as_markup(),
+            reply_markup=_confirm_reply_markup(review_id),
             parse_mode="Markdown"
         )
 
@@ -1154,12 +1708,9 @@ async def process_custom_reply(message: types.Message, state: FSMContext):
         data = await state.get_data()
         review_id = data.get("review_id", "")
 
-        builder = InlineKeyboardBuilder()
-        builder.button(text="◀️ Назад", callback_data=f"review_{review_id}")
-
         await message.answer(
             "❌ Произошла ошибка. Попробуйте ещё раз.",
-            reply_markup=builder.as_markup()
+            reply_markup=_back_markup(review_id)
         )
 
 
@@ -1177,15 +1728,12 @@ async def write_own_callback(callback: types.CallbackQuery, state: FSMContext):
         data = await state.get_data()
         review_id = data.get("review_id")
 
-        # Создаем клавиатуру с кнопкой возврата
-        builder = InlineKeyboardBuilder()
-        builder.button(text="◀️ Назад", callback_data=f"review_{review_id}")
-
         # Запрашиваем пользовательский ответ
-        await callback.message.edit_text(
+        await _edit_text(
+            callback.message,
             "✍️ *Напишите ваш собственный ответ:*\n\n"
             "Отправьте текстовое сообщение с вашим ответом.",
-            reply_markup=builder.as_markup(),
+            reply_markup=_back_markup(review_id),
             parse_mode="Markdown"
         )
 
@@ -1243,8 +1791,8 @@ async def send_reply_handler(callback: types.CallbackQuery, state: FSMContext):
         state: Состояние FSM
     """
     try:
-        # Показываем индикатор загрузки
-        await callback.answer("Отправка ответа...")
+        # Показываем индикатор загрузки, не дожидаясь ответа Telegram
+        answer_task = asyncio.create_task(callback.answer("Отправка ответа..."))
 
         # Получаем данные из состояния
         data = await state.get_data()
@@ -1253,49 +1801,59 @@ async def send_reply_handler(callback: types.CallbackQuery, state: FSMContext):
 
         # Проверяем наличие необходимых данных
         if not review_id:
-            await callback.message.edit_text(
+            await answer_task
+            await _edit_text(
+                callback.message,
                 "❌ Ошибка: ID отзыва не найден",
                 reply_markup=back_button_auto3()
             )
             return
 
         if not reply_text:
-            await callback.message.edit_text(
+            await answer_task
+            await _edit_text(
+                callback.message,
                 "❌ Ошибка: текст ответа не найден",
                 reply_markup=back_button_auto3()
             )
             return
 
-        # Отправляем ответ через API
-        success = await send_review_reply(
-            feedback_id=review_id,
-            text=reply_text,
-            user_id=callback.from_user.id
+        # Отправляем ответ через API, пока Telegram обрабатывает индикатор загрузки;
+        # результаты проверяем по отдельности, чтобы ошибка индикатора (например,
+        # устаревший колбэк) не выдала уже отправленный ответ за неудачный
+        answer_result, success = await asyncio.gather(
+            answer_task,
+            send_review_reply(
+                feedback_id=review_id,
+                text=reply_text,
+                user_id=callback.from_user.id
+            ),
+            return_exceptions=True
         )
 
+        if isinstance(answer_result, Exception):
+            logger.warning(f"Failed to answer callback: {answer_result}")
+
+        if isinstance(success, Exception):
+            raise success
+
         if success:
             # Очищаем состояние
             await state.clear()
 
             # Показываем сообщение об успешной отправке
-            await callback.message.edit_text(
+            await _edit_text(
+                callback.message,
                 "✅ Ответ успешно отправлен!\n\n"
                 "Хотите просмотреть другие отзывы?",
-                reply_markup=InlineKeyboardBuilder()
-                    .button(text="📋 Список отзывов", callback_data="pending_reviews")
-                    .button(text="🏠 Главное меню", callback_data="start")
-                    .adjust(1)
-                    .as_markup()
+                reply_markup=_REPLY_SENT_MARKUP
             )
         else:
             # Показываем сообщение об ошибке
-            await callback.message.edit_text(
+            await _edit_text(
+                callback.message,
                 "❌ Ошибка при отправке ответа. Попробуйте ещё раз.",
-                reply_markup=InlineKeyboardBuilder()
-                    .button(text="🔄 Повторить", callback_data="send_reply")
-                    .button(text="◀️ Назад", callback_data=f"review_{review_id}")
-                    .adjust(1)
-                    .as_markup()
+                reply_markup=_retry_send_markup(review_id)
             )
 
     except Exception as e:
@@ -1306,13 +1864,10 @@ async def send_reply_handler(callback: types.CallbackQuery, state: FSMContext):
             data = await state.get_data()
             review_id = data.get("review_id", "")
 
-            await callback.message.edit_text(
+            await _edit_text(
+                callback.message,
                 "❌ Произошла ошибка при отправке ответа. Попробуйте ещё раз.",
-                reply_markup=InlineKeyboardBuilder()
-                    .button(text="🔄 Повторить", callback_data="send_reply")
-                    .button(text="◀️ Назад", callback_data=f"review_{review_id}")
-                    .adjust(1)
-                    .as_markup()
+                reply_markup=_retry_send_markup(review_id)
             )
         except Exception:
             await callback.answer("❌ Произошла ошибка при отправке ответа", show_alert=True)
@@ -1338,29 +1893,74 @@ async def back_to_reviews_handler(callback: types.CallbackQuery, state: FSMConte
         logger.error(f"Error in back_to_reviews_handler: {e}", exc_info=True)
         await callback.answer("❌ Произошла ошибка", show_alert=True)
 
+# ============ Маршрутизация колбэков по префиксу ============
+
+# Обработчики колбэков вида "<префикс>_<значение>"
+_PREFIX_ROUTES = {
+    "manual": start_manual_reply,
+    "review": review_detail_handler,
+    "generate": start_generation_flow,
+    "page": handle_pagination,
+}
+
+
+@router.callback_query(F.data.regexp(r"^(manual|review|generate|page)_"))
+async def prefix_callback_dispatcher(callback: types.CallbackQuery, state: FSMContext):
+    """
+    Единый обработчик колбэков с префиксом: выбирает обработчик одним поиском в словаре
+
+    Args:
+        callback: Колбэк от кнопки
+        state: Состояние FSM
+    """
+    prefix = callback.data.partition("_")[0]
+    await _PREFIX_ROUTES[prefix](callback, state)
+
+
 # ============ Запуск фоновой задачи ============
 
-async def on_startup(dp):
+async def on_startup(bot: Bot):
     """
     Функция для запуска фоновых задач при старте бота
 
     Args:
-        dp: Диспетчер
+        bot: Экземпляр бота
     """
+    global _scheduler
+
     # Создаем планировщик задач
-    scheduler = AsyncIOScheduler()
+    _scheduler = AsyncIOScheduler()
 
-    # Добавляем задачу проверки отзывов каждые 5 минут
-    scheduler.add_job(
+    # Добавляем задачу проверки отзывов каждые 5 минут.
+    # Запуски не накладываются друг на друга: пропущенные объединяются в один
+    _scheduler.add_job(
         check_new_reviews,
         'interval',
         minutes=5,
-        args=(dp.bot,),
+        # Случайный сдвиг до 30 секунд, чтобы запуски не совпадали с ровными отметками времени
+        jitter=30,
+        args=(bot,),
         kwargs={},
         id='check_reviews',
+        max_instances=1,
+        coalesce=True,
+        misfire_grace_time=60,
         replace_existing=True
     )
 
     # Запускаем планировщик
-    scheduler.start()
-    logger.info("Review check scheduler started")
\ No newline at end of file
+    _scheduler.start()
+    logger.info("Review check scheduler started")
+
+
+async def on_shutdown() -> None:
+    """
+    Останавливает планировщик и фоновые генерации ответов
+    """
+    if _scheduler is not None and _scheduler.running:
+        _scheduler.shutdown(wait=False)
+        logger.info("Review check scheduler stopped")
+
+    # Прерываем незавершенные генерации ответов
+    for task in list(_generation_tasks):
+        task.cancel()
@@ -11,8 +11,8 @@ router = Router()
 
 @router.callback_query(F.data == "settings")
 async def settings_main_menu(callback: types.CallbackQuery):
-    with Session() as session:
-        user = session.get(UserSettings, callback.from_user.id)
+    async with Session() as session:
+        user = await session.get(UserSettings, callback.from_user.id)
 
     text = "⚙️ **Настройки**\n\n"
     if user and user.wb_api_key:
@@ -38,11 +38,11 @@ async def set_api_key_handler(callback: types.CallbackQuery, state: FSMContext):
 
 @router.message(SettingsState.waiting_api_key)
 async def process_api_key(message: types.Message, state: FSMContext):
-    with Session() as session:
-        user = session.get(UserSettings, message.from_user.id) or UserSettings(user_id=message.from_user.id)
+    async with Session() as session:
+        user = await session.get(UserSettings, message.from_user.id) or UserSettings(user_id=message.from_user.id)
         user.wb_api_key = message.text
         session.add(user)
-        session.commit()
+        await session.commit()
 
     await state.clear()
     await message.answer("✅ API-ключ успешно сохранен!", reply_markup=back_to_menu())
@@ -50,11 +50,11 @@ async def process_api_key(message: types.Message, state: FSMContext):
 
 @router.callback_query(F.data == "delete_api_key")
 async def delete_api_key_handler(callback: types.CallbackQuery):
-    with Session() as session:
-        user = session.get(UserSettings, callback.from_user.id)
+    async with Session() as session:
+        user = await session.get(UserSettings, callback.from_user.id)
         if user:
             user.wb_api_key = None
-            session.commit()
+            await session.commit()
 
     await callback.answer("🔑 API-ключ удален", show_alert=True)
     await settings_main_menu(callback)
\ No newline at end of file
@@ -10,8 +10,8 @@ router = Router()
 
 @router.callback_query(F.data == "signatures")
 async def signatures_handler(callback: types.CallbackQuery):
-    with Session() as session:
-        user = session.get(UserSettings, callback.from_user.id)
+    async with Session() as session:
+        user = await session.get(UserSettings, callback.from_user.id)
 
     text = (
         "✍️ **Фирменные подписи**\n\n"
@@ -64,11 +64,11 @@ async def add_farewell_handler(callback: types.CallbackQuery, state: FSMContext)
 
 @router.message(AutoReplyState.waiting_greeting)
 async def process_greeting(message: types.Message, state: FSMContext):
-    with Session() as session:
-        user = session.get(UserSettings, message.from_user.id) or UserSettings(user_id=message.from_user.id)
+    async with Session() as session:
+        user = await session.get(UserSettings, message.from_user.id) or UserSettings(user_id=message.from_user.id)
         user.greeting = message.text
         session.add(user)
-        session.commit()
+        await session.commit()
 
     await state.clear()
     await message.answer("✅ Приветствие успешно сохранено!")
@@ -84,11 +84,11 @@ async def process_greeting(message: types.Message, state: FSMContext):
 
 @router.message(AutoReplyState.waiting_farewell)
 async def process_farewell(message: types.Message, state: FSMContext):
-    with Session() as session:
-        user = session.get(UserSettings, message.from_user.id) or UserSettings(user_id=message.from_user.id)
+    async with Session() as session:
+        user = await session.get(UserSettings, message.from_user.id) or UserSettings(user_id=message.from_user.id)
         user.farewell = message.text
         session.add(user)
-        session.commit()
+        await session.commit()
 
     await state.clear()
     await message.answer("✅ Прощание успешно сохранено!")
@@ -104,11 +104,11 @@ async def process_farewell(message: types.Message, state: FSMContext):
 
 @router.callback_query(F.data == "delete_greeting")
 async def delete_greeting_handler(callback: types.CallbackQuery):
-    with Session() as session:
-        user = session.get(UserSettings, callback.from_user.id)
+    async with Session() as session:
+        user = await session.get(UserSettings, callback.from_user.id)
         if user:
             user.greeting = None
-            session.commit()
+            await session.commit()
 
     await callback.answer("Приветствие удалено", show_alert=True)
     # Отправляем новое сообщение вместо редактирования
@@ -117,11 +117,11 @@ async def delete_greeting_handler(callback: types.CallbackQuery):
 
 @router.callback_query(F.data == "delete_farewell")
 async def delete_farewell_handler(callback: types.CallbackQuery):
-    with Session() as session:
-        user = session.get(UserSettings, callback.from_user.id)
+    async with Session() as session:
+        user = await session.get(UserSettings, callback.from_user.id)
         if user:
             user.farewell = None
-            session.commit()
+            await session.commit()
 
     await callback.answer("Прощание удалено", show_alert=True)
     # Отправляем новое сообщение вместо редактирования
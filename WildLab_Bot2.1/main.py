@@ -1,8 +1,13 @@
 import asyncio
 import logging
 from aiogram import Bot, Dispatcher
+from aiogram.fsm.storage.base import BaseStorage
+from aiogram.fsm.storage.memory import MemoryStorage
 from config import Config
+from db_migration import migrate_database
+from models import IS_SQLITE, engine, init_db
 from utils import pagination, prompts
+from utils.wb_api import close_all_clients
 from handlers import (
     start,
     consultation,
@@ -14,6 +19,25 @@ from handlers import (
     auto_reply_five_stars
 )
 
+def create_storage() -> BaseStorage:
+    """
+    Создает хранилище состояний FSM
+
+    Returns:
+        BaseStorage: RedisStorage, если задан Config.REDIS_URL, иначе MemoryStorage
+    """
+    if not Config.REDIS_URL:
+        return MemoryStorage()
+
+    # Импортируем только при наличии настройки: пакет redis нужен лишь в этом случае
+    from aiogram.fsm.storage.redis import RedisStorage
+
+    return RedisStorage.from_url(
+        Config.REDIS_URL,
+        connection_kwargs={"max_connections": 64}
+    )
+
+
 async def main():
     # Настройка логов
     logging.basicConfig(
@@ -21,9 +45,14 @@ async def main():
         format=Config.LOG_FORMAT
     )
 
+    # Создаем отсутствующие таблицы и добавляем в БД недостающие колонки и индексы
+    await init_db()
+    if IS_SQLITE:
+        migrate_database(engine.url.database)
+
     # Инициализация бота
     bot = Bot(token=Config.API_TOKEN)
-    dp = Dispatcher()
+    dp = Dispatcher(storage=create_storage())
 
     # Регистрация роутеров
     dp.include_router(start.router)
@@ -35,9 +64,27 @@ async def main():
     dp.include_router(reviews.router)
     dp.include_router(auto_reply_five_stars.router)
 
+    # Запускаем периодическую проверку отзывов
+    dp.startup.register(reviews.on_startup)
+
+    # Останавливаем планировщик, закрываем HTTP-сессии API Wildberries и пул соединений БД
+    dp.shutdown.register(reviews.on_shutdown)
+    dp.shutdown.register(close_all_clients)
+    dp.shutdown.register(engine.dispose)
+
     # Запуск поллинга
     await dp.start_polling(bot)
 
 
 if __name__ == "__main__":
+    # uvloop ускоряет цикл событий; если он не установлен (например, на Windows),
+    # используется стандартный цикл asyncio
+    try:
+        import uvloop
+    except ImportError:
+        uvloop = None
+
+    if uvloop is not None:
+        uvloop.install()
+
     asyncio.run(main())
\ No newline at end of file
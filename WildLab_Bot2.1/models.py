@@ -1,5 +1,10 @@
-from sqlalchemy import create_engine, Column, Integer, String, Boolean, Text, ForeignKey
-from sqlalchemy.orm import declarative_base, sessionmaker, relationship
+from sqlalchemy import event, Column, Integer, String, Boolean, Text, ForeignKey, Index, JSON
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.orm import declarative_base, relationship
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from config import Config
+from utils import json_utils
 
 Base = declarative_base()
 
@@ -30,7 +35,8 @@ class Review(Base):
     pros = Column(Text)
     cons = Column(Text)
     photo_url = Column(Boolean, default=False)  # Флаг наличия фото
-    photo_urls = Column(Text)  # JSON-строка с URL фотографий
+    photo_urls = Column(JSON)  # Список URL фотографий
+    photo_count = Column(Integer, default=0)  # Количество фотографий
     response = Column(Text)
     is_answered = Column(Boolean, default=False)
 
@@ -43,7 +49,59 @@ class Review(Base):
     # Связь с пользователем
     user = relationship("UserSettings", back_populates="reviews")
 
+    # Индексы под проверку новых отзывов и постраничный список неотвеченных
+    # (для существующих БД создаются в db_migration.py)
+    __table_args__ = (
+        Index("idx_reviews_user_apiid", "user_id", "source_api_id"),
+        Index("idx_reviews_user_unanswered", "user_id", "is_answered", id.desc()),
+    )
+
 # Инициализация базы данных
-engine = create_engine('sqlite:///bot.db')
-Base.metadata.create_all(engine)
-Session = sessionmaker(bind=engine)
\ No newline at end of file
+# Адрес БД задается в Config.DATABASE_URL (по умолчанию SQLite через aiosqlite,
+# для нагруженной установки — Postgres через asyncpg).
+# Асинхронный драйвер не блокирует цикл событий запросами к БД,
+# пул соединений переиспользует открытые соединения между обработчиками
+IS_SQLITE = Config.DATABASE_URL.startswith('sqlite')
+
+engine = create_async_engine(
+    Config.DATABASE_URL,
+    poolclass=AsyncAdaptedQueuePool,
+    pool_size=10,
+    max_overflow=20,
+    pool_timeout=30,
+    pool_recycle=1800,
+    pool_pre_ping=True,
+    pool_use_lifo=True,
+    connect_args={"check_same_thread": False} if IS_SQLITE else {},
+    # JSON-колонки (photo_urls) сериализуются через orjson, если он установлен
+    json_serializer=json_utils.dumps,
+    json_deserializer=json_utils.loads
+)
+
+
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    """
+    Настраивает каждое новое соединение SQLite один раз при его открытии
+    """
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute("PRAGMA mmap_size=268435456")
+    cursor.close()
+
+
+if IS_SQLITE:
+    event.listen(engine.sync_engine, "connect", set_sqlite_pragmas)
+
+
+async def init_db():
+    """
+    Создает отсутствующие таблицы
+    """
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+
+# expire_on_commit=False: атрибуты объектов остаются доступными после commit без повторного SELECT
+Session = async_sessionmaker(engine, expire_on_commit=False)
@@ -1,8 +1,7 @@
 # update_photos.py
 import asyncio
 import logging
-import json
-import sqlite3
+from itertools import chain
 import sys
 import os
 
@@ -17,8 +16,99 @@ logger = logging.getLogger(__name__)
 sys.path.append(os.path.dirname(os.path.realpath(__file__)))
 
 # Импортируем необходимые модули
-from models import UserSettings, Session
-from utils.wb_api import WildberriesAPI
+from sqlalchemy import Row, bindparam, select, update
+
+from models import Review, UserSettings, Session, engine
+from utils.wb_api import REVIEWS_MAX_TAKE, WildberriesAPI, close_shared_session
+
+# Максимальное число пользователей, обрабатываемых одновременно
+_USERS_CONCURRENCY = 8
+
+# Пакетные обновления по (source_api_id, user_id); параметры передаются списком словарей
+_REVIEW_MATCH = (
+    (Review.source_api_id == bindparam("r_id")) & (Review.user_id == bindparam("r_user_id"))
+)
+_UPDATE_PHOTOS = update(Review.__table__).where(_REVIEW_MATCH).values(
+    photo_urls=bindparam("photo_urls"),
+    photo_url=bindparam("photo_url"),
+    photo_count=bindparam("photo_count")
+)
+_UPDATE_PRODUCT = update(Review.__table__).where(_REVIEW_MATCH).values(
+    supplier_article=bindparam("supplier_article"),
+    product_name=bindparam("product_name"),
+    subject_name=bindparam("subject_name")
+)
+
+
+async def _update_user_photos(user: Row, semaphore: asyncio.Semaphore) -> None:
+    """
+    Обновляет фотографии и информацию о товарах в отзывах одного пользователя
+
+    Args:
+        user: Строка с ID пользователя и его API-ключом
+        semaphore: Ограничение числа пользователей, обрабатываемых одновременно
+    """
+    async with semaphore:
+        try:
+            # Получаем неотвеченные и отвеченные отзывы параллельно;
+            # HTTP-сессия клиента закрывается при выходе из блока
+            async with WildberriesAPI(user.wb_api_key) as api:
+                reviews_1, reviews_2 = await asyncio.gather(
+                    api.get_unanswered_reviews(is_answered=False, take=REVIEWS_MAX_TAKE),
+                    api.get_unanswered_reviews(is_answered=True, take=REVIEWS_MAX_TAKE)
+                )
+            logger.info(f"Retrieved {len(reviews_1) + len(reviews_2)} reviews for user {user.user_id}")
+
+            # Собираем параметры обновлений, чтобы выполнить их пакетно
+            photo_rows = []
+            product_rows = []
+            # Обходим оба списка подряд, не копируя их в общий список
+            for review in chain(reviews_1, reviews_2):
+                review_id = str(review.get("id", ""))
+
+                # Извлекаем URL фотографий, учитывая специфический формат API
+                # (список объектов с полями fullSize и miniSize)
+                raw_photo_links = review.get("photoLinks") or []
+                photo_links = [
+                    photo.get("fullSize") or photo.get("miniSize")
+                    for photo in raw_photo_links
+                    if isinstance(photo, dict) and (photo.get("fullSize") or photo.get("miniSize"))
+                ]
+
+                if photo_links:
+                    # Список URL сериализуется JSON-колонкой
+                    photo_rows.append({
+                        "r_id": review_id,
+                        "r_user_id": user.user_id,
+                        "photo_urls": photo_links,
+                        "photo_url": True,
+                        "photo_count": len(photo_links)
+                    })
+
+                # Информация о товаре: артикул продавца, название и категория
+                product_details = review.get("productDetails") or {}
+                if product_details:
+                    product_rows.append({
+                        "r_id": review_id,
+                        "r_user_id": user.user_id,
+                        "supplier_article": product_details.get("supplierArticle", ""),
+                        "product_name": product_details.get("productName", ""),
+                        "subject_name": review.get("subjectName", "")
+                    })
+
+            # Применяем все обновления одной транзакцией через общий пул соединений
+            update_count = 0
+            async with engine.begin() as conn:
+                if photo_rows:
+                    result = await conn.execute(_UPDATE_PHOTOS, photo_rows)
+                    update_count = result.rowcount
+                if product_rows:
+                    await conn.execute(_UPDATE_PRODUCT, product_rows)
+
+            logger.info(f"Updated {update_count} reviews for user {user.user_id}")
+
+        except Exception as user_error:
+            logger.error(f"Error processing user {user.user_id}: {user_error}")
 
 
 async def update_photos_in_database():
@@ -29,96 +119,21 @@ async def update_photos_in_database():
         logger.info("Starting photo update script")
 
         # Получаем список пользователей с API ключами
-        with Session() as session:
-            users = session.query(UserSettings).filter(UserSettings.wb_api_key != None).all()
-
-            if not users:
-                logger.error("No users with API keys found")
-                return
-
-            logger.info(f"Found {len(users)} users with API keys")
-
-            # Для каждого пользователя
-            for user in users:
-                try:
-                    # Создаем экземпляр API
-                    api = WildberriesAPI(user.wb_api_key)
-
-                    # Получаем отзывы из API
-                    reviews_1 = await api.get_unanswered_reviews(is_answered=False)
-                    reviews_2 = await api.get_unanswered_reviews(is_answered=True)
-                    reviews = reviews_1 + reviews_2
-
-                    logger.info(f"Retrieved {len(reviews)} reviews for user {user.user_id}")
-
-                    # Подключаемся к базе данных напрямую для обновления
-                    conn = sqlite3.connect('bot.db')
-                    cursor = conn.cursor()
-
-                    # Обновляем каждый отзыв
-                    update_count = 0
-                    for review in reviews:
-                        try:
-                            review_id = str(review.get("id", ""))
-
-                            # Извлекаем URL фотографий, учитывая специфический формат API
-                            photo_links = []
-                            raw_photo_links = review.get("photoLinks", [])
-
-                            # Если это список объектов с полями fullSize и miniSize
-                            if isinstance(raw_photo_links, list) and raw_photo_links and isinstance(raw_photo_links[0],
-                                                                                                    dict):
-                                for photo in raw_photo_links:
-                                    if "fullSize" in photo:
-                                        photo_links.append(photo["fullSize"])
-                                    elif "miniSize" in photo:
-                                        photo_links.append(photo["miniSize"])
-
-                            if photo_links:
-                                # Сохраняем список URL как JSON строку
-                                photo_urls_json = json.dumps(photo_links)
-
-                                # Обновляем запись в БД
-                                cursor.execute(
-                                    "UPDATE reviews SET photo_urls = ?, photo_url = ? WHERE source_api_id = ? AND user_id = ?",
-                                    (photo_urls_json, True, review_id, user.user_id)
-                                )
-
-                                if cursor.rowcount > 0:
-                                    update_count += 1
-                                    logger.info(f"Updated photos for review {review_id}: {photo_links}")
-
-                            # Обновляем информацию о товаре
-                            product_details = review.get("productDetails", {})
-                            if product_details:
-                                # Артикул продавца
-                                supplier_article = product_details.get("supplierArticle", "")
-                                # Название товара
-                                product_name = product_details.get("productName", "")
-                                # Категория товара (тип)
-                                subject_name = review.get("subjectName", "")
-
-                                # Обновляем БД
-                                cursor.execute(
-                                    """
-                                    UPDATE reviews 
-                                    SET supplier_article = ?, product_name = ?, subject_name = ?
-                                    WHERE source_api_id = ? AND user_id = ?
-                                    """,
-                                    (supplier_article, product_name, subject_name, review_id, user.user_id)
-                                )
-
-                        except Exception as review_error:
-                            logger.error(f"Error updating review {review.get('id', '')}: {review_error}")
-
-                    # Сохраняем изменения
-                    conn.commit()
-                    conn.close()
-
-                    logger.info(f"Updated {update_count} reviews for user {user.user_id}")
-
-                except Exception as user_error:
-                    logger.error(f"Error processing user {user.user_id}: {user_error}")
+        async with Session() as session:
+            # Загружаем только ID и ключ: строки результата без построения ORM-объектов
+            users = (await session.execute(
+                select(UserSettings.user_id, UserSettings.wb_api_key).where(UserSettings.wb_api_key != None)
+            )).all()
+
+        if not users:
+            logger.error("No users with API keys found")
+            return
+
+        logger.info(f"Found {len(users)} users with API keys")
+
+        # Обрабатываем пользователей параллельно с ограничением числа одновременных запросов к API
+        semaphore = asyncio.Semaphore(_USERS_CONCURRENCY)
+        await asyncio.gather(*(_update_user_photos(user, semaphore) for user in users))
 
         logger.info("Photo update completed")
 
@@ -127,6 +142,17 @@ async def update_photos_in_database():
         return False
 
 
+async def main():
+    """
+    Запускает обновление и закрывает HTTP-сессию и пул соединений БД
+    """
+    try:
+        await update_photos_in_database()
+    finally:
+        await close_shared_session()
+        await engine.dispose()
+
+
 # Запускаем асинхронную функцию
 if __name__ == "__main__":
-    asyncio.run(update_photos_in_database())
\ No newline at end of file
+    asyncio.run(main())
\ No newline at end of file
@@ -0,0 +1,38 @@
+import json
+
+# orjson сериализует и разбирает JSON в несколько раз быстрее стандартного модуля;
+# если он не установлен, используется json из стандартной библиотеки
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def dumps(obj) -> str:
+    """
+    Сериализует объект в JSON-строку
+
+    Args:
+        obj: Объект для сериализации
+
+    Returns:
+        str: JSON-строка
+    """
+    if orjson is not None:
+        return orjson.dumps(obj).decode()
+    return json.dumps(obj)
+
+
+def loads(data):
+    """
+    Разбирает JSON из строки или байтов
+
+    Args:
+        data: JSON-строка или байты
+
+    Returns:
+        Разобранный объект
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
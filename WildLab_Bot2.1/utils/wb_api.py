@@ -1,13 +1,190 @@
 import ssl
-import json
+import time
+import random
+import contextlib
 import aiohttp
 import asyncio
+from config import Config
 from models import UserSettings, Session
+from utils import json_utils
 import logging
-from typing import Dict, Any, List, Optional, Union
+from typing import AsyncIterator, Dict, Any, List, Mapping, Optional, Tuple, Union
+
+# aiodns позволяет разрешать DNS асинхронно, не блокируя цикл событий;
+# без него aiohttp использует резолвер на пуле потоков
+try:
+    import aiodns
+except ImportError:
+    aiodns = None
+
+# httpx нужен только для HTTP/2-транспорта (Config.WB_HTTP2); без него используется aiohttp
+try:
+    import httpx
+except ImportError:
+    httpx = None
 
 logger = logging.getLogger(__name__)
 
+# Время, в течение которого повторный запрос списка отзывов берется из кэша (в секундах)
+_REVIEWS_TTL = 30.0
+
+# Максимальное число закэшированных ответов списка отзывов (разных наборов параметров) у клиента
+_REVIEWS_CACHE_SIZE = 64
+
+# Максимальное число отзывов, запоминаемых клиентом для поиска по ID
+_REVIEW_CACHE_SIZE = 20000
+
+# Размер страницы по умолчанию и максимальный take, допустимый API Wildberries
+_REVIEWS_PAGE_SIZE = 100
+REVIEWS_MAX_TAKE = 5000
+
+# Размер страницы при поиске отзыва по ID
+_REVIEW_LOOKUP_PAGE_SIZE = 200
+
+# Базовая и максимальная задержки между повторными запросами (в секундах)
+_BACKOFF_BASE_DELAY = 1.0
+_BACKOFF_MAX_DELAY = 30.0
+
+
+# Коды ответа, при которых запрос имеет смысл повторить
+_RETRYABLE_STATUSES = frozenset({408, 429, 500, 502, 503, 504})
+
+
+def _backoff_delay(attempt: int, retry_after: Optional[str] = None) -> float:
+    """
+    Вычисляет задержку перед повторным запросом: время из Retry-After, если оно указано
+    (не больше _BACKOFF_MAX_DELAY), иначе экспоненциальная задержка со случайным разбросом ±50%,
+    чтобы повторы разных клиентов не совпадали по времени
+
+    Args:
+        attempt: Номер выполненной попытки (с 1)
+        retry_after: Значение заголовка Retry-After (в секундах), если есть
+
+    Returns:
+        float: Задержка в секундах
+    """
+    if retry_after:
+        try:
+            # Слишком большое значение заголовка не должно надолго останавливать запросы клиента
+            return min(_BACKOFF_MAX_DELAY, max(0.0, float(retry_after)))
+        except ValueError:
+            # Retry-After в формате даты - используем обычную задержку
+            pass
+
+    delay = _BACKOFF_BASE_DELAY * 2 ** attempt * (0.5 + random.random())
+    return min(_BACKOFF_MAX_DELAY, delay)
+
+
+async def _backoff_sleep(attempt: int, retry_after: Optional[str] = None) -> None:
+    """
+    Ждет перед повторным запросом
+
+    Args:
+        attempt: Номер выполненной попытки (с 1)
+        retry_after: Значение заголовка Retry-After (в секундах), если есть
+    """
+    await asyncio.sleep(_backoff_delay(attempt, retry_after))
+
+
+# SSL-контекст с отключенной проверкой сертификатов создается один раз на процесс
+# ВАЖНО: В production использовании рекомендуется включить проверку сертификатов
+_SSL_CONTEXT = ssl.create_default_context()
+_SSL_CONTEXT.check_hostname = False
+_SSL_CONTEXT.verify_mode = ssl.CERT_NONE
+
+# Таймауты запросов: 30 секунд на весь запрос, из них не больше 5 на установку TCP/TLS-соединения
+# и не больше 25 на ожидание данных от сервера. Общий connect не задаем: в aiohttp он включает
+# ожидание свободного соединения в пуле, и запросы из очереди зря тратили бы попытки повтора
+_REQUEST_TIMEOUT = aiohttp.ClientTimeout(total=30, sock_connect=5, sock_read=25)
+
+# Ошибки транспорта, после которых запрос повторяется, с учетом HTTP/2-клиента
+_TIMEOUT_ERRORS = (asyncio.TimeoutError,) + ((httpx.TimeoutException,) if httpx else ())
+_CLIENT_ERRORS = (aiohttp.ClientError,) + ((httpx.TransportError,) if httpx else ())
+
+# Общая HTTP-сессия процесса: все клиенты обращаются к одному хосту и делят пул соединений,
+# а API-ключ передается в заголовках каждого запроса
+_shared_session: Optional[aiohttp.ClientSession] = None
+
+# Общий HTTP/2-клиент httpx (используется, если включен Config.WB_HTTP2)
+_http2_client: Optional["httpx.AsyncClient"] = None
+_http2_available = True
+
+
+def get_shared_session() -> aiohttp.ClientSession:
+    """
+    Возвращает общую HTTP-сессию, создавая ее при первом обращении
+
+    Сессия переиспользует TCP/TLS-соединения между запросами всех пользователей.
+    Создание синхронное, поэтому параллельные обращения не создадут вторую сессию
+
+    Returns:
+        aiohttp.ClientSession: Сессия для выполнения запросов
+    """
+    global _shared_session
+
+    if _shared_session is None or _shared_session.closed:
+        # Адрес API кэшируется на 10 минут, простаивающие соединения держатся открытыми 75 секунд,
+        # чтобы между проверками отзывов не повторять DNS-запрос и TLS-рукопожатие
+        connector = aiohttp.TCPConnector(
+            ssl=_SSL_CONTEXT,
+            limit=200,
+            limit_per_host=50,
+            use_dns_cache=True,
+            ttl_dns_cache=600,
+            resolver=aiohttp.AsyncResolver() if aiodns is not None else None,
+            happy_eyeballs_delay=0.25,
+            keepalive_timeout=75,
+            enable_cleanup_closed=True
+        )
+        _shared_session = aiohttp.ClientSession(connector=connector, timeout=_REQUEST_TIMEOUT)
+
+    return _shared_session
+
+
+def get_http2_client() -> Optional["httpx.AsyncClient"]:
+    """
+    Возвращает общий HTTP/2-клиент httpx, создавая его при первом обращении
+
+    Returns:
+        Optional[httpx.AsyncClient]: Клиент или None, если HTTP/2 выключен или httpx[http2] не установлен
+    """
+    global _http2_client, _http2_available
+
+    if not Config.WB_HTTP2 or httpx is None or not _http2_available:
+        return None
+
+    if _http2_client is None or _http2_client.is_closed:
+        try:
+            # Один клиент мультиплексирует параллельные запросы в рамках одного соединения
+            _http2_client = httpx.AsyncClient(
+                http2=True,
+                verify=_SSL_CONTEXT,
+                timeout=httpx.Timeout(30, connect=5, read=25),
+                limits=httpx.Limits(max_connections=50, max_keepalive_connections=20)
+            )
+        except ImportError as e:
+            # Для http2=True нужен пакет h2
+            logger.warning(f"HTTP/2 transport is unavailable, falling back to aiohttp: {e}")
+            _http2_available = False
+            return None
+
+    return _http2_client
+
+
+async def close_shared_session() -> None:
+    """
+    Закрывает общую HTTP-сессию и HTTP/2-клиент при остановке бота
+    """
+    global _shared_session, _http2_client
+
+    if _shared_session is not None and not _shared_session.closed:
+        await _shared_session.close()
+    _shared_session = None
+
+    if _http2_client is not None:
+        await _http2_client.aclose()
+    _http2_client = None
+
 
 class WildberriesAPI:
     """
@@ -20,17 +197,107 @@ class WildberriesAPI:
         # Базовый URL для API отзывов
         self.base_url = "https://feedbacks-api.wb.ru/api/v1"
 
+        # API-ключ, с которым создан клиент
+        self.api_key = api_key
+
         # Заголовки для запросов
         self.headers = {
             "Authorization": api_key,
             "Content-Type": "application/json"
         }
 
-        # Создаем SSL-контекст с отключенной проверкой сертификатов
-        # ВАЖНО: В production использовании рекомендуется включить проверку сертификатов
-        self.ssl_context = ssl.create_default_context()
-        self.ssl_context.check_hostname = False
-        self.ssl_context.verify_mode = ssl.CERT_NONE
+        # Ограничение частоты запросов: после ответа 429 запросы проходят по одному до этого момента
+        self._rate_limit_gate = asyncio.Semaphore(1)
+        self._rate_limited_until = 0.0
+
+        # Ответы get_unanswered_reviews: параметры запроса -> (время загрузки, отзывы)
+        self._reviews_cache: Dict[tuple, Tuple[float, List[Dict[str, Any]]]] = {}
+
+        # Отзывы из последних ответов API: ID отзыва -> (время загрузки, отзыв),
+        # вытеснение в порядке давности загрузки
+        self._review_cache: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        """
+        Возвращает общую для всех клиентов HTTP-сессию
+
+        Returns:
+            aiohttp.ClientSession: Сессия для выполнения запросов
+        """
+        return get_shared_session()
+
+    async def close(self) -> None:
+        """
+        Освобождает ресурсы клиента
+
+        Общая HTTP-сессия принадлежит процессу и закрывается в close_shared_session()
+        """
+
+    @contextlib.asynccontextmanager
+    async def _rate_limit_slot(self):
+        """
+        Пропускает запрос с учетом ограничения частоты запросов API
+
+        Пока действует лимит после ответа 429, запросы клиента проходят по одному:
+        первый дожидается окончания лимита и проверяет его, остальные ждут своей очереди
+        и не отправляют запросы одновременно
+        """
+        if time.monotonic() >= self._rate_limited_until:
+            yield
+            return
+
+        async with self._rate_limit_gate:
+            delay = self._rate_limited_until - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            yield
+
+    async def __aenter__(self) -> "WildberriesAPI":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self.close()
+
+    async def _send(
+            self,
+            method: str,
+            url: str,
+            params: Dict[str, Any],
+            json_data: Optional[Dict[str, Any]]
+    ) -> Tuple[int, Mapping[str, str], bytes]:
+        """
+        Выполняет один HTTP-запрос через HTTP/2-клиент httpx или общую сессию aiohttp
+
+        Args:
+            method: HTTP метод
+            url: Полный URL запроса
+            params: URL параметры запроса
+            json_data: Данные для отправки в формате JSON
+
+        Returns:
+            Tuple[int, Mapping[str, str], bytes]: Код ответа, заголовки и тело ответа
+        """
+        client = get_http2_client()
+        if client is not None:
+            response = await client.request(
+                method,
+                url,
+                headers=self.headers,
+                params=params,
+                json=json_data
+            )
+            return response.status_code, response.headers, response.content
+
+        session = self._get_session()
+        async with session.request(
+                method=method,
+                url=url,
+                headers=self.headers,
+                params=params,
+                json=json_data
+        ) as response:
+            # Читаем тело ответа байтами: JSON разбирается без промежуточной строки
+            return response.status, response.headers, await response.read()
 
     async def _make_request(
             self,
@@ -55,17 +322,13 @@ class WildberriesAPI:
         """
         url = f"{self.base_url}{endpoint}"
 
-        # Обработка параметров запроса
-        request_params = {}
-        if params:
-            for key, value in params.items():
-                if value is None:
-                    continue
-                # Преобразуем булевы значения в строки "true"/"false" для API
-                if isinstance(value, bool):
-                    request_params[key] = str(value).lower()
-                else:
-                    request_params[key] = value
+        # Обработка параметров запроса: пропускаем None,
+        # булевы значения преобразуем в строки "true"/"false" для API
+        request_params = {
+            key: ("true" if value else "false") if value.__class__ is bool else value
+            for key, value in params.items()
+            if value is not None
+        } if params else {}
 
         # Счетчик попыток
         attempts = 0
@@ -74,71 +337,64 @@ class WildberriesAPI:
         while attempts < retry_count:
             attempts += 1
             try:
-                # Используем кастомный SSL-контекст с отключенной проверкой сертификатов
-                connector = aiohttp.TCPConnector(ssl=self.ssl_context)
-
-                async with aiohttp.ClientSession(connector=connector) as session:
-                    async with session.request(
-                            method=method,
-                            url=url,
-                            headers=self.headers,
-                            params=request_params,
-                            json=json_data,
-                            timeout=30  # Таймаут запроса 30 секунд
-                    ) as response:
-                        # Получаем текст ответа для логгирования
-                        response_text = await response.text()
-
-                        # Проверяем код ответа
-                        if response.status == 429:  # Rate limit
-                            retry_after = int(response.headers.get("Retry-After", 5))
-                            logger.warning(f"Rate limit reached. Retrying after {retry_after} seconds...")
-                            await asyncio.sleep(retry_after)
+                async with self._rate_limit_slot():
+                    status, headers, raw = await self._send(method, url, request_params, json_data)
+
+                    # Временные ошибки (таймаут, перегрузка, лимит запросов) повторяем,
+                    # соблюдая Retry-After, если сервер его передал
+                    if status in _RETRYABLE_STATUSES:
+                        logger.warning(
+                            f"Retryable API error: Status {status} ({attempts}/{retry_count})"
+                        )
+                        last_error = f"API error (Status: {status})"
+                        if attempts < retry_count:
+                            retry_after = headers.get("Retry-After")
+                            if status == 429:
+                                # Лимит общий для всех запросов клиента: повтор дождется его
+                                # окончания в _rate_limit_slot вместе с остальными запросами
+                                self._rate_limited_until = max(
+                                    self._rate_limited_until,
+                                    time.monotonic() + _backoff_delay(attempts, retry_after)
+                                )
+                            else:
+                                await _backoff_sleep(attempts, retry_after)
                             continue
+                        return {"error": {
+                            "message": f"API error after {retry_count} retries (Status: {status})"}}
 
-                        # Пробуем прочитать JSON ответ
-                        try:
-                            # Сбрасываем указатель на начало содержимого ответа
-                            response_json = json.loads(response_text)
-                        except json.JSONDecodeError:
-                            logger.error(f"Invalid JSON response: {response_text}")
-                            return {"error": {"message": f"Invalid JSON response (Status: {response.status})"}}
-
-                        # Проверяем наличие ошибок в ответе API по коду статуса
-                        if response.status >= 400:
-                            error_info = f"API error: Status {response.status}, Response: {response_text}"
-                            logger.error(error_info)
-
-                            # Если ошибка связана с авторизацией, не пытаемся повторить запрос
-                            if response.status in (401, 403):
-                                return {"error": {"message": f"Authentication error (Status: {response.status})"}}
-
-                            # Для других ошибок пробуем повторить запрос
-                            if attempts < retry_count:
-                                # Увеличиваем задержку с каждой попыткой (экспоненциальная задержка)
-                                await asyncio.sleep(2 ** attempts)
-                                continue
-                            else:
-                                return {"error": {
-                                    "message": f"API error after {retry_count} retries (Status: {response.status})"}}
+                    # Остальные ошибки постоянные - повтор не поможет
+                    if status >= 400:
+                        error_info = f"API error: Status {status}, Response: {raw.decode('utf-8', 'replace')}"
+                        logger.error(error_info)
+
+                        if status in (401, 403):
+                            return {"error": {"message": f"Authentication error (Status: {status})"}}
+                        return {"error": {"message": f"API error (Status: {status})"}}
+
+                    # Пробуем прочитать JSON ответ
+                    try:
+                        response_json = json_utils.loads(raw)
+                    except ValueError:
+                        logger.error(f"Invalid JSON response: {raw.decode('utf-8', 'replace')}")
+                        return {"error": {"message": f"Invalid JSON response (Status: {status})"}}
 
-                        # Проверяем формат ответа
-                        if not isinstance(response_json, dict):
-                            logger.warning(f"Unexpected response format: {response_json}")
-                            return {"data": response_json}
+                    # Проверяем формат ответа
+                    if not isinstance(response_json, dict):
+                        logger.warning(f"Unexpected response format: {response_json}")
+                        return {"data": response_json}
 
-                        return response_json
+                    return response_json
 
-            except asyncio.TimeoutError:
+            except _TIMEOUT_ERRORS:
                 logger.warning(f"Request timeout ({attempts}/{retry_count})")
                 last_error = "Request timeout"
                 # Увеличиваем задержку перед повторной попыткой
-                await asyncio.sleep(2 ** attempts)
+                await _backoff_sleep(attempts)
 
-            except aiohttp.ClientError as e:
+            except _CLIENT_ERRORS as e:
                 logger.error(f"HTTP client error: {str(e)} ({attempts}/{retry_count})")
                 last_error = f"HTTP client error: {str(e)}"
-                await asyncio.sleep(2 ** attempts)
+                await _backoff_sleep(attempts)
 
             except Exception as e:
                 logger.error(f"Unexpected error in API request: {str(e)}", exc_info=True)
@@ -149,7 +405,8 @@ class WildberriesAPI:
         logger.error(f"All {retry_count} retry attempts failed. Last error: {last_error}")
         return {"error": {"message": last_error}}
 
-    def _extract_photo_links(self, review: Dict[str, Any]) -> List[str]:
+    @staticmethod
+    def _extract_photo_links(review: Dict[str, Any]) -> List[str]:
         """
         Извлекает ссылки на фотографии из отзыва с учетом специфического формата API Wildberries
 
@@ -161,36 +418,36 @@ class WildberriesAPI:
         """
         try:
             # Получаем значение поля photoLinks
-            photo_links = review.get("photoLinks", [])
+            photo_links = review.get("photoLinks")
 
             # Если поле отсутствует или пустое
             if not photo_links:
                 return []
 
-            # Если это список объектов с полями fullSize и miniSize
-            if isinstance(photo_links, list) and isinstance(photo_links[0], dict):
-                result = []
-                for photo in photo_links:
-                    # Извлекаем URL полноразмерного изображения
-                    if "fullSize" in photo:
-                        result.append(photo["fullSize"])
-                    elif "miniSize" in photo:
-                        result.append(photo["miniSize"])
-                return result
-
-            # Если это уже список URL
-            if isinstance(photo_links, list) and isinstance(photo_links[0], str):
-                return photo_links
+            # Основной формат API - список объектов с полями fullSize и miniSize:
+            # разбираем его сразу, без предварительных проверок типов
+            try:
+                return [
+                    url for photo in photo_links
+                    if (url := photo.get("fullSize") or photo.get("miniSize"))
+                ]
+            except (AttributeError, TypeError):
+                pass
 
             # Если это строка JSON
             if isinstance(photo_links, str):
                 try:
-                    parsed = json.loads(photo_links)
-                    if isinstance(parsed, list):
-                        # Рекурсивно обрабатываем распарсенный список
-                        return self._extract_photo_links({"photoLinks": parsed})
-                except json.JSONDecodeError:
+                    parsed = json_utils.loads(photo_links)
+                except ValueError:
                     return []
+                # Рекурсивно обрабатываем распарсенный список
+                if isinstance(parsed, list):
+                    return WildberriesAPI._extract_photo_links({"photoLinks": parsed})
+                return []
+
+            # Если это уже список URL
+            if isinstance(photo_links, list) and isinstance(photo_links[0], str):
+                return photo_links
 
             # Если ничего не подошло
             return []
@@ -202,7 +459,7 @@ class WildberriesAPI:
     async def get_unanswered_reviews(
             self,
             is_answered: Optional[bool] = False,
-            take: int = 5000,
+            take: int = _REVIEWS_PAGE_SIZE,
             skip: int = 0,
             nmId: Optional[int] = None,
             order: str = "dateDesc"
@@ -212,7 +469,7 @@ class WildberriesAPI:
 
         Args:
             is_answered: Флаг отвеченных отзывов
-            take: Количество запрашиваемых отзывов
+            take: Количество запрашиваемых отзывов (не больше REVIEWS_MAX_TAKE)
             skip: Смещение от начала списка
             nmId: Артикул товара (опционально)
             order: Порядок сортировки (dateDesc - сначала новые, dateAsc - сначала старые)
@@ -220,6 +477,12 @@ class WildberriesAPI:
         Returns:
             List[Dict[str, Any]]: Список отзывов или пустой список в случае ошибки
         """
+        # Повторный запрос с теми же параметрами в течение _REVIEWS_TTL секунд берем из кэша
+        cache_key = (is_answered, take, skip, nmId, order)
+        cached = self._reviews_cache.get(cache_key)
+        if cached and time.monotonic() - cached[0] < _REVIEWS_TTL:
+            return list(cached[1])
+
         try:
             # Формируем параметры запроса - используем строки "true" и "false" вместо булевых значений
             # т.к. API ожидает именно такой формат
@@ -254,19 +517,141 @@ class WildberriesAPI:
                 logger.error(f"Invalid response format: feedbacks is not a list: {feedbacks}")
                 return []
 
+            # Запоминаем отзывы по ID для get_review_by_id
+            self._index_reviews(feedbacks)
+
+            self._store_reviews_page(cache_key, feedbacks)
+
             logger.info(f"Successfully fetched {len(feedbacks)} feedbacks")
-            return feedbacks
+            return list(feedbacks)
 
         except Exception as e:
             logger.error(f"Error fetching reviews: {str(e)}", exc_info=True)
             return []
 
-    async def get_review_by_id(self, feedback_id: str) -> Optional[Dict[str, Any]]:
+    def _index_reviews(self, feedbacks: List[Dict[str, Any]]) -> None:
+        """
+        Добавляет отзывы в индекс по ID, вытесняя давно загруженные записи
+
+        Args:
+            feedbacks: Отзывы из ответа API
+        """
+        now = time.monotonic()
+        index = self._review_cache
+        for review in feedbacks:
+            review_id = str(review.get("id", ""))
+            # Обновленная запись становится последней в порядке вытеснения
+            index.pop(review_id, None)
+            index[review_id] = (now, review)
+
+        while len(index) > _REVIEW_CACHE_SIZE:
+            index.pop(next(iter(index)))
+
+    def _indexed_review(self, feedback_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Получение отзыва из индекса, если он загружен не раньше _REVIEWS_TTL секунд назад
+
+        Args:
+            feedback_id: ID отзыва
+
+        Returns:
+            Optional[Dict[str, Any]]: Отзыв или None, если его нет в индексе или запись устарела
+        """
+        cached = self._review_cache.get(feedback_id)
+        if cached is None:
+            return None
+        if time.monotonic() - cached[0] >= _REVIEWS_TTL:
+            # Статус отзыва мог измениться - устаревшую копию не возвращаем
+            del self._review_cache[feedback_id]
+            return None
+        return cached[1]
+
+    @staticmethod
+    def _find_review(page: List[Dict[str, Any]], feedback_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Поиск отзыва по ID в странице ответа API
+
+        Args:
+            page: Отзывы из ответа API
+            feedback_id: ID отзыва
+
+        Returns:
+            Optional[Dict[str, Any]]: Отзыв или None, если его нет на странице
+        """
+        return next((review for review in page if str(review.get("id", "")) == feedback_id), None)
+
+    def _store_reviews_page(self, cache_key: tuple, feedbacks: List[Dict[str, Any]]) -> None:
+        """
+        Сохраняет ответ списка отзывов в кэш, удаляя устаревшие и самые старые записи
+
+        Args:
+            cache_key: Параметры запроса
+            feedbacks: Отзывы из ответа API
+        """
+        now = time.monotonic()
+        cache = self._reviews_cache
+
+        # Устаревшие ответы больше не будут прочитаны - удаляем их при каждой записи
+        for key in [key for key, (loaded_at, _) in cache.items() if now - loaded_at >= _REVIEWS_TTL]:
+            del cache[key]
+
+        # Новая запись становится последней; при переполнении вытесняем самую старую
+        cache.pop(cache_key, None)
+        while len(cache) >= _REVIEWS_CACHE_SIZE:
+            cache.pop(next(iter(cache)))
+        cache[cache_key] = (now, feedbacks)
+
+    async def iter_unanswered_reviews(
+            self,
+            is_answered: Optional[bool] = False,
+            page_size: int = _REVIEWS_PAGE_SIZE,
+            skip: int = 0,
+            nmId: Optional[int] = None,
+            order: str = "dateDesc"
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Постраничный обход отзывов: следующая страница запрашивается только по мере чтения
+
+        Args:
+            is_answered: Флаг отвеченных отзывов
+            page_size: Количество отзывов на странице
+            skip: Смещение первой страницы
+            nmId: Артикул товара (опционально)
+            order: Порядок сортировки
+
+        Yields:
+            Dict[str, Any]: Отзыв из API
+        """
+        while True:
+            page = await self.get_unanswered_reviews(
+                is_answered=is_answered,
+                take=page_size,
+                skip=skip,
+                nmId=nmId,
+                order=order
+            )
+            for review in page:
+                yield review
+
+            # Неполная страница - отзывов больше нет
+            if len(page) < page_size:
+                return
+            skip += page_size
+
+    async def get_review_by_id(
+            self,
+            feedback_id: str,
+            nmId: Optional[int] = None,
+            is_answered_hint: Optional[bool] = None
+    ) -> Optional[Dict[str, Any]]:
         """
         Получение информации о конкретном отзыве по его ID
 
         Args:
             feedback_id: ID отзыва
+            nmId: Артикул товара, если известен (сужает выборку API)
+            is_answered_hint: Статус ответа, если он известен вызывающему коду
+                (тогда запрашивается только соответствующий список)
 
         Returns:
             Optional[Dict[str, Any]]: Данные отзыва или None в случае ошибки
@@ -274,24 +659,40 @@ class WildberriesAPI:
         try:
             logger.info(f"Getting review by ID: {feedback_id}")
 
-            # По логам мы видим, что эндпоинт /feedbacks/{id} не существует или недоступен
-            # Поэтому используем только метод получения через список отзывов
-
-            # Получаем все отзывы (отвеченные и неотвеченные)
-            all_reviews_1 = await self.get_unanswered_reviews(is_answered=False)
-            all_reviews_2 = await self.get_unanswered_reviews(is_answered=True)
-
-            # Объединяем списки
-            all_reviews = all_reviews_1 + all_reviews_2
-
-            logger.info(f"Retrieved {len(all_reviews)} total reviews")
+            # Отзыв недавно встречался в ответах API этого клиента
+            review = self._indexed_review(feedback_id)
+            if review is not None:
+                return review
 
-            # Ищем нужный отзыв по ID
-            for review in all_reviews:
-                if str(review.get("id", "")) == feedback_id:
+            # По логам мы видим, что эндпоинт /feedbacks/{id} не существует или недоступен
+            # Поэтому ищем отзыв в списках неотвеченных и отвеченных отзывов (или только в одном,
+            # если статус известен); их первые страницы независимы - запрашиваем их параллельно
+            statuses = (False, True) if is_answered_hint is None else (is_answered_hint,)
+            page_size = _REVIEW_LOOKUP_PAGE_SIZE
+            first_pages = await asyncio.gather(*(
+                self.get_unanswered_reviews(is_answered=is_answered, take=page_size, nmId=nmId)
+                for is_answered in statuses
+            ))
+
+            # Ищем в самих полученных страницах: индекс мог вытеснить их записи
+            for page in first_pages:
+                review = self._find_review(page, feedback_id)
+                if review is not None:
                     logger.info(f"Found review {feedback_id} in the list")
                     return review
 
+            # Остальные страницы запрашиваются, только пока отзыв не найден
+            for is_answered, page in zip(statuses, first_pages):
+                if len(page) < page_size:
+                    continue
+
+                async for review in self.iter_unanswered_reviews(
+                        is_answered=is_answered, page_size=page_size, skip=page_size, nmId=nmId
+                ):
+                    if str(review.get("id", "")) == feedback_id:
+                        logger.info(f"Found review {feedback_id} in the list")
+                        return review
+
             logger.warning(f"Review {feedback_id} not found in any list")
             return None
 
@@ -333,6 +734,11 @@ class WildberriesAPI:
                 logger.error(f"Error sending reply: {error_text}")
                 return False
 
+            # Списки отзывов изменились - сбрасываем закэшированные ответы
+            # и убираем из индекса устаревшую неотвеченную копию отзыва
+            self._reviews_cache.clear()
+            self._review_cache.pop(feedback_id, None)
+
             logger.info(f"Successfully sent reply to feedback {feedback_id}")
             return True
 
@@ -382,6 +788,43 @@ class WildberriesAPI:
             return None
 
 
+# Клиенты API с пулом соединений: user_id -> клиент
+_clients: Dict[int, WildberriesAPI] = {}
+
+
+async def get_wb_api(user_id: int, api_key: str) -> WildberriesAPI:
+    """
+    Возвращает клиент API Wildberries пользователя, переиспользуя его между вызовами
+
+    Args:
+        user_id: ID пользователя
+        api_key: API-ключ пользователя
+
+    Returns:
+        WildberriesAPI: Клиент API
+    """
+    client = _clients.get(user_id)
+    if client is None or client.api_key != api_key:
+        # Ключ изменился - освобождаем старого клиента
+        if client is not None:
+            await client.close()
+
+        client = WildberriesAPI(api_key)
+        _clients[user_id] = client
+
+    return client
+
+
+async def close_all_clients() -> None:
+    """
+    Освобождает клиентов API и закрывает общую HTTP-сессию при остановке бота
+    """
+    for client in _clients.values():
+        await client.close()
+    _clients.clear()
+    await close_shared_session()
+
+
 async def fetch_reviews(user_id: int) -> List[Dict[str, Any]]:
     """
     Функция для получения отзывов через API Wildberries
@@ -393,21 +836,23 @@ async def fetch_reviews(user_id: int) -> List[Dict[str, Any]]:
         List[Dict[str, Any]]: Список отзывов или пустой список в случае ошибки
     """
     try:
-        with Session() as session:
-            user = session.get(UserSettings, user_id)
+        async with Session() as session:
+            user = await session.get(UserSettings, user_id)
             if not user or not user.wb_api_key:
                 logger.warning(f"User {user_id} has no API key")
                 return []
 
-            api = WildberriesAPI(user.wb_api_key)
-            return await api.get_unanswered_reviews()
+            api_key = user.wb_api_key
+
+        api = await get_wb_api(user_id, api_key)
+        return await api.get_unanswered_reviews(take=REVIEWS_MAX_TAKE)
 
     except Exception as e:
         logger.error(f"Error fetching reviews for user {user_id}: {str(e)}", exc_info=True)
         return []
 
 
-async def normalize_review_fields(review: Dict[str, Any]) -> Dict[str, Any]:
+def normalize_review_fields(review: Dict[str, Any]) -> Dict[str, Any]:
     """
     Нормализует поля отзыва к единому формату для использования в боте
 
@@ -419,7 +864,6 @@ async def normalize_review_fields(review: Dict[str, Any]) -> Dict[str, Any]:
     """
     try:
         normalized = {}
-        api = None  # Создаем экземпляр API только если нужно
 
         # ID отзыва (обязательное поле)
         normalized["source_api_id"] = str(review.get("id", ""))
@@ -430,45 +874,30 @@ async def normalize_review_fields(review: Dict[str, Any]) -> Dict[str, Any]:
         # Текст отзыва (комментарий)
         normalized["comment"] = review.get("text", "")
 
-        # Достоинства (безопасная проверка)
-        normalized["pros"] = review.get("pros", "")
-        if normalized["pros"] is None:
-            normalized["pros"] = ""
-
-        # Недостатки (безопасная проверка)
-        normalized["cons"] = review.get("cons", "")
-        if normalized["cons"] is None:
-            normalized["cons"] = ""
+        # Достоинства и недостатки (None заменяем пустой строкой)
+        normalized["pros"] = review.get("pros") or ""
+        normalized["cons"] = review.get("cons") or ""
 
         # Обработка фотографий
-        # Создаем экземпляр API для извлечения фотографий
-        if api is None:
-            api = WildberriesAPI("")  # Пустой API-ключ, т.к. нам нужны только вспомогательные методы
-
-        photo_links = api._extract_photo_links(review)
+        photo_links = WildberriesAPI._extract_photo_links(review)
 
         if photo_links:
-            normalized["photo_urls"] = json.dumps(photo_links)
+            normalized["photo_urls"] = photo_links
             normalized["photo_url"] = True
         else:
-            normalized["photo_urls"] = "[]"
+            normalized["photo_urls"] = []
             normalized["photo_url"] = False
 
-        # Статус ответа (безопасная проверка)
-        normalized["is_answered"] = review.get("isAnswered", False)
-        if normalized["is_answered"] is None:
-            normalized["is_answered"] = False
+        # Статус ответа
+        normalized["is_answered"] = bool(review.get("isAnswered"))
 
-        # Ответ (если есть) - с безопасной проверкой вложенности
-        answer = review.get("answer", {})
-        if answer is not None and isinstance(answer, dict):
-            normalized["response"] = answer.get("text", "")
-        else:
-            normalized["response"] = ""
+        # Ответ (если есть)
+        answer = review.get("answer") or {}
+        normalized["response"] = answer.get("text", "") if isinstance(answer, dict) else ""
 
         # Информация о товаре
-        product_details = review.get("productDetails", {})
-        if product_details is not None and isinstance(product_details, dict):
+        product_details = review.get("productDetails") or {}
+        if isinstance(product_details, dict):
             normalized["product_name"] = product_details.get("productName", "")
             normalized["product_id"] = str(product_details.get("nmId", ""))
             normalized["supplier_article"] = product_details.get("supplierArticle", "")
@@ -493,10 +922,10 @@ async def normalize_review_fields(review: Dict[str, Any]) -> Dict[str, Any]:
             "pros": "",
             "cons": "",
             "photo_url": False,
-            "photo_urls": "[]",
+            "photo_urls": [],
             "response": "",
             "product_name": "",
             "product_id": "",
             "supplier_article": "",
             "subject_name": ""
-        }
\ No newline at end of file
+        }